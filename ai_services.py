@@ -1,22 +1,84 @@
 # ai_services.py
 
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from cache import SingleFlight, build_cache, make_cache_key, normalize_text
+from llm_providers import LLMProvider, get_context_registry, get_provider
+from preprocess import PREPROCESS_VERSION, estimate_tokens, preprocess_job_description
+from tracing import increment, span
 
 # Load environment variables from .env file BEFORE accessing them
 load_dotenv()
 
-# Configure the Gemini API with your API key
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Sampling temperature; part of the response cache key together with the provider and model
+TEMPERATURE = 0.7
+
+# Bump whenever the prompt template below changes so stale cached responses are not reused
+PROMPT_VERSION = "2"
+
+# Register the stable prompt prefix as a cached context once it is at least this many tokens
+# (providers bill and cache prefixes in blocks; shorter prefixes are cheaper to resend)
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+
+# Seconds a caller waits for an identical LLM request already in progress
+LLM_WAIT_TIMEOUT = int(os.getenv("LLM_WAIT_TIMEOUT", "600"))
+
+_response_cache = None
+
+# Concurrent identical requests (keyed like the response cache) share one LLM call
+_optimize_flights = SingleFlight("optimize", timeout_seconds=LLM_WAIT_TIMEOUT)
+_section_flights = SingleFlight("section", timeout_seconds=LLM_WAIT_TIMEOUT)
+_stream_flights = SingleFlight("optimize_stream", timeout_seconds=LLM_WAIT_TIMEOUT)
+
+def get_response_cache():
+    """
+    Return the process-wide response cache, creating it on first use.
+    """
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = build_cache("response")
+    return _response_cache
+
+def resolve_provider(provider=None):
+    """
+    Accept a provider instance, a provider name, or None for the configured default.
+    """
+    if isinstance(provider, LLMProvider):
+        return provider
+    return get_provider(provider)
+
+def response_cache_key(base_resume, base_cover_letter, job_description, preprocess=True, provider=None):
+    """
+    Hash the normalized inputs together with the prompt version, provider/model and temperature.
+    """
+    return make_cache_key(
+        normalize_text(base_resume),
+        normalize_text(base_cover_letter),
+        normalize_text(job_description),
+        prompt_version=PROMPT_VERSION,
+        preprocess_version=PREPROCESS_VERSION if preprocess else None,
+        model=resolve_provider(provider).cache_identity,
+        temperature=TEMPERATURE,
+    )
+
+SYSTEM_PROMPT = "You are a skilled resume optimization agent who will help optimize resumes based on job descriptions.\n\n"
 
-def optimize_resume(base_resume, base_cover_letter, job_description):
+def build_prompt(base_resume, base_cover_letter, job_description):
     """
-    Generate an optimized resume and tailored cover letter using the Google Gemini API.
+    Build the full optimization prompt for the given inputs.
     """
-    # Clean and preprocess inputs if needed (optional)
-    
-    prompt = f"""Task: Resume Optimization for Job Application
+    return build_prompt_prefix(base_resume, base_cover_letter) + build_prompt_suffix(job_description)
+
+def build_prompt_prefix(base_resume, base_cover_letter):
+    """
+    The part of the prompt that is the same for every job description: the instructions,
+    the output format and the base documents. It can be registered once as a cached
+    context (see llm_providers.ContextRegistry) and reused for many jobs.
+    """
+    return f"""Task: Resume Optimization for Job Application
 
 Objective:
 Optimize a base resume and cover letter to align with the provided Job Description. Maximize appeal for both ATS systems and human reviewers.
@@ -45,15 +107,6 @@ Instructions:
 10. Provide an estimated ATS compatibility percentage and explain 3 specific factors that influenced this score.
 11. Include a brief section with 2-3 specific interview talking points the candidate should prepare.
 
----BASE RESUME---
-{base_resume}
-
----BASE COVER LETTER---
-{base_cover_letter}
-
----JOB DESCRIPTION---
-{job_description}
-
 Output the final result in the following format:
 
 RESUME:
@@ -80,26 +133,525 @@ ATS COMPATIBILITY ANALYSIS:
 
 INTERVIEW PREPARATION:
 [2-3 key talking points based on job requirements and resume]
+
+---BASE RESUME---
+{base_resume}
+
+---BASE COVER LETTER---
+{base_cover_letter}
 """
-    # Create a Gemini model instance - using newer model
-    model = genai.GenerativeModel('models/gemini-2.0-pro-exp')
-    
-    # Call the Gemini API with system prompt and user prompt in a conversation format
-    chat = model.start_chat(history=[])
-    response = chat.send_message(
-        "You are a skilled resume optimization agent who will help optimize resumes based on job descriptions.\n\n" + prompt,
-        generation_config=genai.types.GenerationConfig(
-            temperature=0.7
-        )
-    )
-    
-    # Clean up the output to remove any introductory text
-    output_text = response.text
-    
-    # Remove any introductory text before the first section header
+
+def build_prompt_suffix(job_description):
+    """
+    The per-job part of the prompt, sent after the (possibly cached) prefix.
+    """
+    return f"""
+---JOB DESCRIPTION---
+{job_description}
+"""
+
+def prepare_prompt(base_resume, base_cover_letter, job_description, preprocess=True):
+    """
+    Build the prompt, first shrinking the job description with the local pre-analysis.
+
+    Returns:
+    - (prompt, report) where report holds the token estimates before and after preprocessing
+    """
+    prefix, suffix, report = prepare_prompt_parts(base_resume, base_cover_letter, job_description, preprocess)
+    return prefix + suffix, report
+
+def prepare_prompt_parts(base_resume, base_cover_letter, job_description, preprocess=True):
+    """
+    Like prepare_prompt, but keep the stable prefix and the per-job suffix apart.
+
+    Returns:
+    - (prefix, suffix, report) where report also holds the prefix token estimate
+    """
+    with span("prepare_prompt", preprocess=preprocess, input_chars=len(job_description)) as prompt_span:
+        prefix = build_prompt_prefix(base_resume, base_cover_letter)
+        prefix_tokens = estimate_tokens(prefix)
+        original_prompt_tokens = prefix_tokens + estimate_tokens(build_prompt_suffix(job_description))
+        report = {}
+        if preprocess:
+            job_description, report = preprocess_job_description(job_description, base_resume)
+        suffix = build_prompt_suffix(job_description)
+        report["original_prompt_tokens"] = original_prompt_tokens
+        report["prompt_tokens"] = prefix_tokens + estimate_tokens(suffix)
+        report["prefix_tokens"] = prefix_tokens
+        report["saved_prompt_tokens"] = original_prompt_tokens - report["prompt_tokens"]
+        prompt_span.set(prompt_tokens=report["prompt_tokens"], saved_prompt_tokens=report["saved_prompt_tokens"])
+        increment("saved_prompt_tokens", report["saved_prompt_tokens"], stage="prepare_prompt")
+    return prefix, suffix, report
+
+def clean_output(output_text):
+    """
+    Remove any introductory text before the first section header.
+    """
     # Look for the first occurrence of "RESUME:" and start from there
     if "RESUME:" in output_text:
         output_text = "RESUME:" + output_text.split("RESUME:", 1)[1]
-    
+    return output_text
+
+def _send_prompt(prompt, provider=None, stream=False):
+    """
+    Send the prompt to the LLM provider.
+
+    Returns:
+    - The response text, or an iterator of text chunks when stream=True
+    """
+    provider = resolve_provider(provider)
+    if stream:
+        return provider.stream(SYSTEM_PROMPT + prompt, TEMPERATURE)
+    return provider.generate(SYSTEM_PROMPT + prompt, TEMPERATURE)
+
+def use_context_cache(provider, prefix):
+    """
+    Whether prefix should be sent as a cached context (see _send_prompt_parts).
+
+    Disabled with CONTEXT_CACHE=0, for providers without context support, and for
+    prefixes shorter than CONTEXT_CACHE_MIN_TOKENS.
+    """
+    return (os.getenv("CONTEXT_CACHE", "1") != "0" and provider.supports_context_cache
+            and estimate_tokens(SYSTEM_PROMPT + prefix) >= CONTEXT_CACHE_MIN_TOKENS)
+
+def _send_prompt_parts(prefix, suffix, provider=None, stream=False, context_owner=None):
+    """
+    Send a prompt made of a stable prefix (instructions and base documents) and a per-job suffix.
+
+    If use_context_cache() allows it, the prefix is registered once per provider as a
+    cached context and later requests only send the suffix with its handle. The context
+    expires after CONTEXT_CACHE_TTL seconds, and is dropped as soon as context_owner
+    (e.g. a session) sends a different prefix because its base documents changed.
+
+    Returns:
+    - The response text, or an iterator of text chunks when stream=True
+    """
+    provider = resolve_provider(provider)
+    if not use_context_cache(provider, prefix):
+        return _send_prompt(prefix + suffix, provider, stream)
+    if stream:
+        return _stream_with_context(prefix, suffix, provider, context_owner)
+    registry, entry = _acquire_context(prefix, provider, context_owner)
+    try:
+        return provider.generate_with_context(entry["handle"], suffix, TEMPERATURE)
+    finally:
+        registry.release(entry)
+
+def _acquire_context(prefix, provider, context_owner):
+    registry = get_context_registry()
+    with span("context_lookup", provider=provider.cache_identity):
+        return registry, registry.acquire(provider, SYSTEM_PROMPT + prefix, owner=context_owner)
+
+def _stream_with_context(prefix, suffix, provider, context_owner):
+    # The context is leased until the stream is exhausted or closed
+    registry, entry = _acquire_context(prefix, provider, context_owner)
+    try:
+        yield from provider.stream_with_context(entry["handle"], suffix, TEMPERATURE)
+    finally:
+        registry.release(entry)
+
+def optimize_resume(base_resume, base_cover_letter, job_description, use_cache=True, preprocess=True,
+                    provider=None, context_owner=None):
+    """
+    Generate an optimized resume and tailored cover letter using the configured LLM
+    provider (Google Gemini by default, see llm_providers).
+
+    Identical inputs are served from the response cache instead of calling the LLM again.
+    With preprocess=True the job description is stripped of boilerplate and duplicates first.
+    The instructions and base documents are sent as a cached context when possible
+    (see _send_prompt_parts); pass context_owner to invalidate it when they change.
+    """
+    provider = resolve_provider(provider)
+    with span("optimize_resume", provider=provider.cache_identity) as request_span:
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            cache_key = response_cache_key(base_resume, base_cover_letter, job_description, preprocess, provider)
+            cached_output = cache.get(cache_key)
+            request_span.set(cache_hit=cached_output is not None)
+            if cached_output is not None:
+                return cached_output
+
+            # Identical requests already in flight (another session, a double click) are joined
+            return _optimize_flights.do(cache_key, _generate_optimization, base_resume, base_cover_letter,
+                                        job_description, preprocess, provider, context_owner, cache, cache_key)
+        return _generate_optimization(base_resume, base_cover_letter, job_description, preprocess, provider,
+                                      context_owner)
+
+def _generate_optimization(base_resume, base_cover_letter, job_description, preprocess, provider, context_owner,
+                           cache=None, cache_key=None):
+    prefix, suffix, report = prepare_prompt_parts(base_resume, base_cover_letter, job_description, preprocess)
+    with span("llm_call", provider=provider.cache_identity, prompt_tokens=report["prompt_tokens"],
+              context_cached=use_context_cache(provider, prefix)) as llm_span:
+        response_text = _send_prompt_parts(prefix, suffix, provider, context_owner=context_owner)
+        llm_span.set(output_tokens=estimate_tokens(response_text))
+
+    # Clean up the output to remove any introductory text
+    output_text = clean_output(response_text)
+
+    if cache is not None:
+        cache.set(cache_key, output_text)
+
     # Return the cleaned response text
     return output_text
+
+def optimize_resume_stream(base_resume, base_cover_letter, job_description, use_cache=True, preprocess=True,
+                           provider=None, context_owner=None):
+    """
+    Streaming variant of optimize_resume that yields text chunks as the LLM produces them.
+
+    Feed the chunks to utils.StreamingSectionParser to fill sections progressively.
+    A cached response is yielded as a single chunk. Identical streams already in flight
+    are joined: the chunks produced so far are replayed, then new ones follow as they
+    arrive. The complete, cleaned output is stored in the response cache once the
+    stream has finished.
+    """
+    provider = resolve_provider(provider)
+    with span("optimize_resume", provider=provider.cache_identity, stream=True) as request_span:
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            cache_key = response_cache_key(base_resume, base_cover_letter, job_description, preprocess, provider)
+            cached_output = cache.get(cache_key)
+            request_span.set(cache_hit=cached_output is not None)
+            if cached_output is not None:
+                yield cached_output
+                return
+
+            yield from _stream_flights.stream(cache_key, _generate_optimization_stream, base_resume,
+                                              base_cover_letter, job_description, preprocess, provider,
+                                              context_owner, cache, cache_key)
+            return
+        yield from _generate_optimization_stream(base_resume, base_cover_letter, job_description, preprocess,
+                                                 provider, context_owner)
+
+def _generate_optimization_stream(base_resume, base_cover_letter, job_description, preprocess, provider,
+                                  context_owner, cache=None, cache_key=None):
+    prefix, suffix, report = prepare_prompt_parts(base_resume, base_cover_letter, job_description, preprocess)
+    chunks = []
+    with span("llm_call", provider=provider.cache_identity, prompt_tokens=report["prompt_tokens"],
+              context_cached=use_context_cache(provider, prefix)) as llm_span:
+        started = time.perf_counter()
+        for text in _send_prompt_parts(prefix, suffix, provider, stream=True, context_owner=context_owner):
+            if not chunks:
+                llm_span.set(time_to_first_chunk_ms=round((time.perf_counter() - started) * 1000, 3))
+            chunks.append(text)
+            yield text
+        output_text = "".join(chunks)
+        llm_span.set(output_tokens=estimate_tokens(output_text))
+
+    if cache is not None:
+        cache.set(cache_key, clean_output(output_text))
+
+# --------------------------
+# Parallel section orchestration
+# --------------------------
+
+# Output sections in the order they appear in the assembled output
+SECTION_ORDER = ["RESUME", "COVER LETTER", "ATS COMPATIBILITY ANALYSIS", "INTERVIEW PREPARATION"]
+
+SECTION_INSTRUCTIONS = "IMPORTANT: Do NOT include any introductory statements, greetings, commentary or section headers. Start directly with the requested content."
+
+def build_analysis_prompt(job_description):
+    """
+    Prompt for the shared job description analysis that every section request builds on.
+    """
+    return f"""Task: Job Description Analysis
+
+{SECTION_INSTRUCTIONS}
+
+Analyze the Job Description below and list concisely, as plain-text bullet lists:
+- Key skills and qualifications required
+- Specific technologies, tools, and methodologies mentioned
+- Company values and culture indicators
+- Industry-specific terminology and keywords (ATS keywords)
+
+---JOB DESCRIPTION---
+{job_description}
+"""
+
+def build_section_prompt(section, base_resume, base_cover_letter, job_description, analysis):
+    """
+    Prompt for one output section, given the shared job description analysis.
+    """
+    if section == "RESUME":
+        task = """Optimize the Base Resume for the job.
+1. Rephrase and prioritize the existing content to emphasize relevant skills and experiences in order to improve the ATS score to 90% or higher.
+2. Only introduce new skills when necessary and maintain the order of existing content.
+3. Incorporate relevant keywords from the analysis in a natural way.
+4. Adjust job titles for better relevance if needed, clearly noting any changes made.
+5. Quantify achievements where possible (e.g., "improved process efficiency by 30%").
+6. Output the optimized resume in plain text (copy-and-paste ready, no formatting)."""
+        documents = f"---BASE RESUME---\n{base_resume}"
+    elif section == "COVER LETTER":
+        task = """Draft a tailored cover letter between 200 and 400 words, based on the Base Cover Letter, that:
+- Addresses specific requirements from the job description
+- Highlights 2-3 most relevant accomplishments from the resume
+- Demonstrates knowledge of the company/industry
+- Explains why the candidate is particularly suited for this role
+- Includes a clear call to action"""
+        documents = f"---BASE RESUME---\n{base_resume}\n\n---BASE COVER LETTER---\n{base_cover_letter}"
+    elif section == "ATS COMPATIBILITY ANALYSIS":
+        task = """Provide an estimated ATS compatibility percentage for the Optimized Resume and explain 3 specific factors that influenced this score, using exactly this markdown format:
+## ATS Compatibility Analysis
+### Estimated ATS Passing Percentage: XX%
+
+#### Key factors influencing score:
+1. [First factor]
+2. [Second factor]
+3. [Third factor]
+
+#### Suggested improvements:
+* [First suggestion]
+* [Second suggestion]
+* [Third suggestion if applicable]"""
+        documents = f"---OPTIMIZED RESUME---\n{base_resume}"
+    elif section == "INTERVIEW PREPARATION":
+        task = "List 2-3 specific interview talking points the candidate should prepare, based on the job requirements and the resume."
+        documents = f"---BASE RESUME---\n{base_resume}"
+    else:
+        raise ValueError(f"Unknown section: {section}")
+
+    return f"""Task: {section.title()} for Job Application
+
+{SECTION_INSTRUCTIONS}
+
+{task}
+
+---JOB DESCRIPTION ANALYSIS---
+{analysis}
+
+{documents}
+
+---JOB DESCRIPTION---
+{job_description}
+"""
+
+def _strip_section_header(text, section):
+    text = text.strip()
+    if text.upper().startswith(section + ":"):
+        text = text[len(section) + 1:].strip()
+    # The ATS section is re-wrapped in a markdown fence when assembled
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0].strip()
+    return text
+
+def generate_cached(prompt, cache=None, provider=None, stage="llm_call", refresh=False):
+    """
+    Send a single prompt to the LLM, memoized by the exact prompt text and model settings.
+
+    With refresh=True the cached response is ignored and replaced by a new one.
+    The request is traced as a span named stage.
+    """
+    provider = resolve_provider(provider)
+    with span(stage, provider=provider.cache_identity, prompt_tokens=estimate_tokens(prompt)) as llm_span:
+        if cache is not None:
+            cache_key = make_cache_key(prompt, prompt_version=PROMPT_VERSION, model=provider.cache_identity,
+                                       temperature=TEMPERATURE)
+            cached_output = None if refresh else cache.get(cache_key)
+            llm_span.set(cache_hit=cached_output is not None)
+            if cached_output is not None:
+                return cached_output
+        if cache is not None and not refresh:
+            # Identical section requests already in flight (e.g. from another session) are joined
+            output_text = _section_flights.do(cache_key, _generate_and_cache, prompt, provider, cache, cache_key)
+        else:
+            output_text = _generate_and_cache(prompt, provider, cache, cache_key if cache is not None else None)
+        llm_span.set(output_tokens=estimate_tokens(output_text))
+        return output_text
+
+def _generate_and_cache(prompt, provider, cache=None, cache_key=None):
+    output_text = _send_prompt(prompt, provider)
+    if cache is not None:
+        cache.set(cache_key, output_text)
+    return output_text
+
+def assemble_sections(sections):
+    """
+    Join section texts into the RESUME:/COVER LETTER:/... layout app.py parses.
+    """
+    return (
+        f"RESUME:\n{sections['RESUME']}\n\n"
+        f"COVER LETTER:\n{sections['COVER LETTER']}\n\n"
+        f"ATS COMPATIBILITY ANALYSIS:\n```markdown\n{sections['ATS COMPATIBILITY ANALYSIS']}\n```\n\n"
+        f"INTERVIEW PREPARATION:\n{sections['INTERVIEW PREPARATION']}\n"
+    )
+
+def _generate_sections(base_resume, base_cover_letter, job_description, regenerate, reused=None,
+                       refresh=(), cache=None, provider=None):
+    """
+    Generate the sections listed in regenerate concurrently and take the rest from reused.
+
+    The resume, cover letter and interview points run in parallel; the ATS analysis
+    runs as soon as the (new or reused) optimized resume exists. Sections in refresh
+    bypass the cache so the user gets a new version.
+
+    Returns:
+    - A dictionary mapping each section header (without the colon) to its text
+    """
+    reused = reused or {}
+    if not regenerate:
+        return {section: reused[section] for section in SECTION_ORDER}
+
+    analysis = generate_cached(build_analysis_prompt(job_description), cache, provider, stage="llm_analysis")
+
+    def generate_section(section, resume_text=base_resume):
+        if section not in regenerate:
+            return reused[section]
+        prompt = build_section_prompt(section, resume_text, base_cover_letter, job_description, analysis)
+        stage = "llm_section_" + section.lower().replace(" ", "_")
+        output_text = generate_cached(prompt, cache, provider, stage=stage, refresh=section in refresh)
+        return _strip_section_header(output_text, section)
+
+    def generate_resume_and_ats():
+        resume = generate_section("RESUME")
+        return resume, generate_section("ATS COMPATIBILITY ANALYSIS", resume_text=resume)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        resume_future = executor.submit(generate_resume_and_ats)
+        cover_letter_future = executor.submit(generate_section, "COVER LETTER")
+        interview_future = executor.submit(generate_section, "INTERVIEW PREPARATION")
+
+        resume, ats_analysis = resume_future.result()
+        return {
+            "RESUME": resume,
+            "COVER LETTER": cover_letter_future.result(),
+            "ATS COMPATIBILITY ANALYSIS": ats_analysis,
+            "INTERVIEW PREPARATION": interview_future.result(),
+        }
+
+def optimize_resume_parallel(base_resume, base_cover_letter, job_description, use_cache=True, preprocess=True,
+                             provider=None):
+    """
+    Generate the same output as optimize_resume with smaller, concurrent section requests.
+
+    A shared job description analysis runs first. The resume, cover letter and
+    interview points are then generated in parallel; the ATS analysis runs as
+    soon as the optimized resume exists. End-to-end latency is the analysis plus
+    the longest section chain instead of the sum of all sections.
+    """
+    provider = resolve_provider(provider)
+    with span("optimize_resume_parallel", provider=provider.cache_identity) as request_span:
+        cache = get_response_cache() if use_cache else None
+        if preprocess:
+            job_description, report = preprocess_job_description(job_description, base_resume)
+            request_span.set(saved_jd_tokens=report["saved_tokens"])
+            increment("saved_prompt_tokens", report["saved_tokens"], stage="optimize_resume_parallel")
+
+        sections = _generate_sections(base_resume, base_cover_letter, job_description, SECTION_ORDER,
+                                      cache=cache, provider=provider)
+        return assemble_sections(sections)
+
+# --------------------------
+# Incremental re-optimization
+# --------------------------
+
+# The user inputs each output section is generated from.
+# The ATS analysis also depends on the optimized resume (see sections_to_regenerate).
+SECTION_INPUTS = {
+    "RESUME": ("base_resume", "job_description"),
+    "COVER LETTER": ("base_resume", "base_cover_letter", "job_description"),
+    "ATS COMPATIBILITY ANALYSIS": ("job_description",),
+    "INTERVIEW PREPARATION": ("base_resume", "job_description"),
+}
+
+def changed_inputs(previous_input, new_input, preprocess=True):
+    """
+    Compare two user_input dictionaries (base_resume, base_cover_letter, job_description).
+
+    Whitespace-only edits are ignored. With preprocess=True the job descriptions are
+    compared after preprocessing, so edits to boilerplate the model never sees do not count.
+
+    Returns:
+    - The set of input names that changed
+    """
+    changed = set()
+    for name in ("base_resume", "base_cover_letter", "job_description"):
+        if normalize_text(previous_input.get(name, "")) != normalize_text(new_input.get(name, "")):
+            changed.add(name)
+    if preprocess and "job_description" in changed:
+        previous_jd, _ = preprocess_job_description(previous_input.get("job_description", ""),
+                                                    previous_input.get("base_resume", ""))
+        new_jd, _ = preprocess_job_description(new_input.get("job_description", ""),
+                                               new_input.get("base_resume", ""))
+        if normalize_text(previous_jd) == normalize_text(new_jd):
+            changed.discard("job_description")
+    return changed
+
+def sections_to_regenerate(changed, redo=()):
+    """
+    Sections whose inputs are in changed, plus the explicitly requested sections in redo.
+
+    A regenerated resume always invalidates the ATS analysis of it.
+
+    Returns:
+    - A list of section headers (without the colon) in output order
+    """
+    sections = {section for section, inputs in SECTION_INPUTS.items() if changed & set(inputs)}
+    sections.update(redo)
+    if "RESUME" in sections:
+        sections.add("ATS COMPATIBILITY ANALYSIS")
+    return [section for section in SECTION_ORDER if section in sections]
+
+def needs_full_run(previous_input, previous_output, new_input, preprocess=True):
+    """
+    Whether an incremental run would regenerate every section anyway: the previous output
+    is missing sections, or the edits (e.g. a new job description) affect all of them.
+    A full single-prompt run is then faster and cheaper than the per-section prompts.
+    """
+    from utils import parse_optimization_output
+
+    parsed = parse_optimization_output(previous_output or "")
+    if not all(parsed.has_section(section) for section in SECTION_ORDER):
+        return True
+    changed = changed_inputs(previous_input or {}, new_input, preprocess)
+    return len(sections_to_regenerate(changed)) == len(SECTION_ORDER)
+
+def optimize_resume_incremental(base_resume, base_cover_letter, job_description, previous_input,
+                                previous_output, redo=(), use_cache=True, preprocess=True, provider=None,
+                                context_owner=None):
+    """
+    Re-optimize after an edit, regenerating only the sections affected by it.
+
+    previous_input and previous_output are the user_input and optimization output of
+    the last run (as stored in st.session_state by app.py). Sections whose inputs did
+    not change are copied from previous_output; the others, and any sections listed
+    in redo, are generated with the per-section prompts of optimize_resume_parallel.
+    Falls back to optimize_resume when needs_full_run says every section would be
+    regenerated anyway.
+
+    Returns:
+    - (output, regenerated) where regenerated is the list of sections that were generated
+    """
+    from utils import parse_optimization_output
+
+    provider = resolve_provider(provider)
+    with span("optimize_resume_incremental", provider=provider.cache_identity) as request_span:
+        new_input = {
+            "base_resume": base_resume,
+            "base_cover_letter": base_cover_letter,
+            "job_description": job_description,
+        }
+        if needs_full_run(previous_input, previous_output, new_input, preprocess):
+            request_span.set(fallback=True)
+            output = optimize_resume(base_resume, base_cover_letter, job_description, use_cache=use_cache,
+                                     preprocess=preprocess, provider=provider, context_owner=context_owner)
+            return output, list(SECTION_ORDER)
+
+        parsed = parse_optimization_output(previous_output)
+        regenerate = sections_to_regenerate(changed_inputs(previous_input or {}, new_input, preprocess), redo)
+        request_span.set(regenerated=len(regenerate), regenerated_sections=",".join(regenerate))
+        increment("incremental_sections", len(regenerate), outcome="regenerated")
+        increment("incremental_sections", len(SECTION_ORDER) - len(regenerate), outcome="reused")
+
+        reused = {
+            "RESUME": parsed.resume,
+            "COVER LETTER": parsed.cover_letter,
+            "ATS COMPATIBILITY ANALYSIS": parsed.ats_markdown,
+            "INTERVIEW PREPARATION": parsed.interview_preparation,
+        }
+        if regenerate and preprocess:
+            job_description, _ = preprocess_job_description(job_description, base_resume)
+        cache = get_response_cache() if use_cache else None
+        sections = _generate_sections(base_resume, base_cover_letter, job_description, regenerate,
+                                      reused=reused, refresh=redo, cache=cache, provider=provider)
+        return assemble_sections(sections), regenerate
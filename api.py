@@ -0,0 +1,300 @@
+# api.py
+# This module contains a headless ASGI HTTP service exposing extraction,
+# optimization, ATS scoring and streaming on top of utils and ai_services,
+# for programmatic clients that do not need the Streamlit UI.
+#
+# Every worker process keeps one provider client (see llm_providers.get_provider),
+# created at startup and reused by all requests, and shares the on-disk response
+# cache with the other workers.
+#
+# Usage:
+#   python api.py --host 0.0.0.0 --port 8000 --workers 4
+#   uvicorn api:app --workers 4
+#
+# Endpoints:
+#   GET  /health
+#   GET  /metrics                  per-stage latency (see tracing.py)
+#   POST /extract                  multipart upload ("file") -> {"text", "file_type", "sections"}
+#   POST /ats-score                {"resume", "job_description", "top_n"?} -> ats_scorer.score_resume result
+#   POST /optimize                 {"base_resume", "base_cover_letter", "job_description", ...} -> {"output", "sections"}
+#   POST /optimize/stream          same body; Server-Sent Events with "chunk" and "done" events
+#   GET  /history                  ?q=&company=&since=&until=&page=&page_size= -> paginated run summaries
+#   GET  /history/{run_id}         one past run with its inputs and output
+#
+# When HISTORY_PATH is set, every optimization is recorded in the local history
+# store (see history.py) and anyone who can reach the API can read it.
+# Set API_KEY to require a matching X-API-Key header on every request except /health.
+
+import argparse
+import hmac
+import io
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from ai_services import optimize_resume, optimize_resume_parallel, optimize_resume_stream, resolve_provider
+from ats_scorer import score_resume
+from history import HISTORY_PAGE_SIZE, get_history_store, record_run
+from tracing import render_prometheus
+from utils import SECTION_HEADERS, extract_text_from_file, parse_optimization_output, split_into_sections
+
+# Largest accepted upload for /extract
+MAX_UPLOAD_BYTES = int(os.getenv("API_MAX_UPLOAD_MB", "10")) * 1024 * 1024
+
+OPTIMIZE_FIELDS = ("base_resume", "base_cover_letter", "job_description")
+
+
+class APIError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+async def _json_body(request, required):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise APIError("Request body must be JSON")
+    if not isinstance(body, dict):
+        raise APIError("Request body must be a JSON object")
+    missing = [field for field in required if not isinstance(body.get(field), str) or not body[field].strip()]
+    if missing:
+        raise APIError(f"Missing or empty fields: {', '.join(missing)}")
+    return body
+
+
+def _bool_field(body, name, default):
+    value = body.get(name, default)
+    if not isinstance(value, bool):
+        raise APIError(f"'{name}' must be true or false")
+    return value
+
+
+def _int_field(body, name, default, minimum=None):
+    value = body.get(name, default)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise APIError(f"'{name}' must be an integer")
+    if minimum is not None and value < minimum:
+        raise APIError(f"'{name}' must be at least {minimum}")
+    return value
+
+
+def _optimize_options(body):
+    """
+    Optional optimization settings accepted by /optimize and /optimize/stream.
+    """
+    provider_name = body.get("provider")
+    if provider_name is not None and not isinstance(provider_name, str):
+        raise APIError("'provider' must be a string")
+    try:
+        provider = resolve_provider(provider_name or None)
+    except ValueError as e:
+        raise APIError(str(e))
+    return {
+        "use_cache": _bool_field(body, "use_cache", True),
+        "preprocess": _bool_field(body, "preprocess", True),
+        "provider": provider,
+    }
+
+
+def _sections(output):
+    parsed = parse_optimization_output(output)
+    return {header[:-1]: parsed.sections.get(header[:-1], "") for header in SECTION_HEADERS}
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def metrics(request):
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+async def extract(request):
+    form = await request.form(max_files=1)
+    try:
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "read"):
+            raise APIError("Upload a file in the 'file' form field")
+        data = await upload.read(MAX_UPLOAD_BYTES + 1)
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise APIError("File is too large", status_code=413)
+    finally:
+        await form.close()
+
+    uploaded_file = io.BytesIO(data)
+    uploaded_file.name = upload.filename or ""
+    text = await run_in_threadpool(extract_text_from_file, uploaded_file)
+    if text == "Unsupported file format":
+        raise APIError(text, status_code=415)
+    if text.startswith("Error extracting text:"):
+        raise APIError(text, status_code=422)
+    sections = [{"section": section, "text": section_text} for section, section_text in split_into_sections(text)]
+    return JSONResponse({"text": text, "file_type": uploaded_file.name.rsplit(".", 1)[-1].lower(),
+                         "sections": sections})
+
+
+async def ats_score(request):
+    body = await _json_body(request, ("resume", "job_description"))
+    top_n = _int_field(body, "top_n", 15, minimum=1)
+    result = await run_in_threadpool(score_resume, body["resume"], body["job_description"], None, top_n)
+    return JSONResponse(result)
+
+
+async def optimize(request):
+    body = await _json_body(request, OPTIMIZE_FIELDS)
+    options = _optimize_options(body)
+    optimize_func = optimize_resume_parallel if _bool_field(body, "parallel", False) else optimize_resume
+    started = time.perf_counter()
+    output = await run_in_threadpool(optimize_func, *(body[field] for field in OPTIMIZE_FIELDS), **options)
+    await run_in_threadpool(_record, body, output, time.perf_counter() - started)
+    return JSONResponse({"output": output, "sections": _sections(output)})
+
+
+def _record(body, output, duration_seconds):
+    return record_run({field: body[field] for field in OPTIMIZE_FIELDS}, output,
+                      duration_seconds=duration_seconds, source="api")
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def optimize_stream(request):
+    body = await _json_body(request, OPTIMIZE_FIELDS)
+    chunks = optimize_resume_stream(*(body[field] for field in OPTIMIZE_FIELDS), **_optimize_options(body))
+
+    async def events():
+        started = time.perf_counter()
+        parts = []
+        try:
+            # The provider stream is blocking, so it is iterated on the thread pool
+            async for chunk in iterate_in_threadpool(chunks):
+                parts.append(chunk)
+                yield _event("chunk", {"text": chunk})
+        except Exception as e:
+            yield _event("error", {"error": str(e)})
+            return
+        output = "".join(parts)
+        await run_in_threadpool(_record, body, output, time.perf_counter() - started)
+        yield _event("done", {"sections": _sections(output)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _history():
+    history = get_history_store()
+    if history is None:
+        raise APIError("History is disabled", status_code=404)
+    return history
+
+
+def _float_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise APIError(f"'{name}' must be a Unix timestamp")
+
+
+async def history_search(request):
+    params = request.query_params
+    try:
+        page = int(params.get("page", 1))
+        page_size = min(int(params.get("page_size", HISTORY_PAGE_SIZE)), 100)
+    except ValueError:
+        raise APIError("'page' and 'page_size' must be integers")
+    if page_size < 1:
+        raise APIError("'page_size' must be at least 1")
+    result = await run_in_threadpool(
+        _history().search, params.get("q", ""), params.get("company", ""),
+        _float_param(request, "since"), _float_param(request, "until"), page, page_size,
+    )
+    return JSONResponse(result)
+
+
+async def history_run(request):
+    run = await run_in_threadpool(_history().get, request.path_params["run_id"])
+    if run is None:
+        raise APIError("Run not found", status_code=404)
+    return JSONResponse(dict(run, sections=_sections(run["output"])))
+
+
+async def api_error(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=exc.status_code)
+
+
+async def unexpected_error(request, exc):
+    return JSONResponse({"error": f"{type(exc).__name__}: {exc}"}, status_code=500)
+
+
+class APIKeyMiddleware:
+    """
+    Reject requests without the X-API-Key header matching API_KEY (if it is set).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.api_key = os.getenv("API_KEY", "")
+
+    async def __call__(self, scope, receive, send):
+        if self.api_key and scope["type"] == "http" and scope["path"] != "/health":
+            provided = dict(scope["headers"]).get(b"x-api-key", b"")
+            if not hmac.compare_digest(provided, self.api_key.encode("utf-8")):
+                await JSONResponse({"error": "Invalid or missing API key"}, status_code=401)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Create this worker's model client once, before the first request arrives
+    try:
+        await run_in_threadpool(lambda: resolve_provider().connect())
+    except Exception as e:
+        print(f"Could not connect to the LLM provider at startup: {e}")
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/metrics", metrics),
+        Route("/extract", extract, methods=["POST"]),
+        Route("/ats-score", ats_score, methods=["POST"]),
+        Route("/optimize", optimize, methods=["POST"]),
+        Route("/optimize/stream", optimize_stream, methods=["POST"]),
+        Route("/history", history_search),
+        Route("/history/{run_id:int}", history_run),
+    ],
+    exception_handlers={APIError: api_error, Exception: unexpected_error},
+    lifespan=lifespan,
+)
+app.add_middleware(APIKeyMiddleware)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the resume optimization HTTP API.")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", "1")),
+                        help="Worker processes, each with its own model client")
+    args = parser.parse_args(argv)
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,44 @@
-import os  # Import the os module
-from dotenv import load_dotenv  # Import load_dotenv
+import datetime
+import os
+import time
+import uuid
+from functools import partial
 import streamlit as st
-import google.generativeai as genai
-import io
-import PyPDF2
-from docx import Document  # Correctly import Document from python-docx
-import re
 
-# Load environment variables from .env file BEFORE accessing them
-load_dotenv()
-
-# Configure the Gemini API with your API key
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Environment variables and the Gemini client are loaded once by ai_services on first use;
+# file parsers are imported by utils only when a file of that type is uploaded.
 
 # Import utility functions from utils.py
-from utils import extract_text_from_file, remove_bullet_points_from_sections
+from utils import SECTION_HEADERS, parse_optimization_output
 
-# Import the optimize_resume function from ai_services.py
-from ai_services import optimize_resume
+# Import the background job subsystem that runs the optimization functions from ai_services.py
+from jobs import get_job_manager, submit_optimization, QUEUED, DONE, ERROR
 
 # Import UI components from ui_components.py
-from ui_components import load_css, apply_custom_css, render_header, render_input_cards, render_action_button
+from ui_components import load_css, apply_custom_css, render_header, render_input_cards, render_action_button, render_ats_score, render_diagnostics_panel
+
+# Import the tracing layer (per-stage latency statistics and the optional /metrics endpoint)
+from tracing import counters, stage_stats, start_metrics_server
+
+# Import the local ATS keyword scorer
+from ats_scorer import score_resume
+
+# Import the section dependency helpers used for incremental re-optimization
+from ai_services import SECTION_ORDER, changed_inputs, needs_full_run, sections_to_regenerate
+
+# Import the DOCX/PDF export subsystem (templates are compiled once per process)
+from export import DEFAULT_TEMPLATE, FORMATS, TEMPLATES, ZIP_MIME, export_document, export_zip, \
+    unsupported_pdf_characters
+
+# Import the local history store of past runs
+from history import get_history_store
 
 # Streamlit Web Interface configuration
 st.set_page_config(page_title="Resume Optimization Agent", page_icon="📄", layout="wide")
 
+# Serve /metrics once per process when TRACE_METRICS_PORT is set
+start_metrics_server()
+
 # Load and apply custom CSS
 css = load_css("styles.css")
 apply_custom_css(css)
@@ -44,9 +58,84 @@ if 'is_mobile' not in st.session_state:
 else:
     is_mobile = st.session_state['is_mobile']
 
+# Identifies this session's cached model context, so it is released when the base documents change
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
+
 # Set the default active tab in session state if not set yet.
 if 'active_tab' not in st.session_state:
-    st.session_state['active_tab'] = "Data Entry"  # Options: "Data Entry" or "Results"
+    st.session_state['active_tab'] = "Data Entry"  # Options: "Data Entry", "Results" or "History"
+
+# Restore an in-flight or finished job after a page refresh
+if 'optimization_job_id' not in st.session_state and "job" in st.query_params:
+    if get_job_manager().get(st.query_params["job"]) is not None:
+        st.session_state['optimization_job_id'] = st.query_params["job"]
+    else:
+        st.query_params.pop("job", None)
+
+def open_history_run(run_id):
+    """
+    Show a past run from the history store in the Results view, without another LLM call.
+    """
+    run = get_history_store().get(run_id)
+    if run is None:
+        st.error("That run is no longer in the history.")
+        return
+    st.session_state['optimization_output'] = run["output"]
+    st.session_state['user_input'] = run["user_input"]
+    st.session_state['regenerated_sections'] = None
+    st.session_state["active_tab"] = "Results"
+    st.rerun()
+
+def format_timestamp(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+@st.fragment(run_every=1)
+def render_job_status():
+    """
+    Poll the background optimization job and show its progress without blocking the session.
+    """
+    job_id = st.session_state['optimization_job_id']
+    job = get_job_manager().get(job_id)
+
+    if job is None:
+        st.warning("The optimization job has expired. Please run it again.")
+        del st.session_state['optimization_job_id']
+        st.query_params.pop("job", None)
+        return
+
+    if job["status"] == DONE:
+        optimization_output = job["result"]
+
+        # Save the optimization output and the original user input
+        st.session_state['optimization_output'] = optimization_output
+        st.session_state['user_input'] = job["metadata"]["user_input"]
+        st.session_state['regenerated_sections'] = job["progress"].get("regenerated")
+        del st.session_state['optimization_job_id']
+        st.query_params.pop("job", None)
+        get_job_manager().discard(job_id, st.session_state['session_id'])
+
+        # Update the session state to switch to the Results view
+        st.session_state["active_tab"] = "Results"
+        st.rerun()  # Re-run the app so the UI immediately shows the Results
+    elif job["status"] == ERROR:
+        st.error(f"An error occurred: {job['error']}")
+        del st.session_state['optimization_job_id']
+        st.query_params.pop("job", None)
+        get_job_manager().discard(job_id, st.session_state['session_id'])
+    else:
+        elapsed = time.time() - (job["started_at"] or job["submitted_at"])
+        if job["status"] == QUEUED:
+            st.info("Waiting for a free worker...")
+        else:
+            st.info(f"Analyzing job description and optimizing materials... ({elapsed:.0f}s)")
+
+        # Live preview of the sections streamed so far
+        if job["progress"]:
+            preview_tabs = st.tabs([header[:-1].title() for header in SECTION_HEADERS])
+            for header, preview_tab in zip(SECTION_HEADERS, preview_tabs):
+                with preview_tab:
+                    st.text(job["progress"].get(header[:-1], ""))
 
 # Render the header with logo and navigation
 render_header()
@@ -67,14 +156,23 @@ with st.expander("About this tool"):
     * Review and personalize the AI-generated content before submitting
     """)
 
+# Per-stage latency breakdown, enabled with ?diagnostics=1 or SHOW_DIAGNOSTICS=1
+if st.query_params.get("diagnostics") == "1" or os.getenv("SHOW_DIAGNOSTICS") == "1":
+    render_diagnostics_panel(stage_stats(), counters())
+
 # Use st.radio to replicate tab switching for main sections
+main_tabs = ["Data Entry", "Results", "History"]
 selected_tab = st.radio(
     "Go to:",
-    ["Data Entry", "Results"],
-    index=0 if st.session_state["active_tab"] == "Data Entry" else 1,
+    main_tabs,
+    index=main_tabs.index(st.session_state["active_tab"]),
     horizontal=True
 )
 
+# Poll the background optimization job, if one is running for this session
+if 'optimization_job_id' in st.session_state:
+    render_job_status()
+
 # --------------------------
 # Data Entry Section
 # --------------------------
@@ -93,40 +191,80 @@ if selected_tab == "Data Entry":
         job_description and job_description.strip()
     )
     
+    # Instant local ATS check of the base resume, available before any LLM call
+    if base_resume and base_resume.strip() and job_description and job_description.strip():
+        with st.expander("Instant ATS keyword check"):
+            render_ats_score(score_resume(base_resume, job_description))
+
+    # Offer the saved result when these exact inputs were optimized before
+    history = get_history_store()
+    previous_run = history.find(base_resume, base_cover_letter, job_description) if all_inputs_provided and history else None
+    if previous_run is not None:
+        st.info(f"These materials were already optimized on {format_timestamp(previous_run['created_at'])}.")
+        if st.button("Open the saved result", key="open_previous_run"):
+            open_history_run(previous_run["id"])
+
+    parallel_sections = st.checkbox(
+        "Generate sections in parallel (faster, no live preview)",
+        key="parallel_sections"
+    )
+
+    # Incremental re-optimization: keep the sections of the last run that the edits do not affect
+    previous_input = st.session_state.get('user_input')
+    previous_output = st.session_state.get('optimization_output')
+    incremental = False
+    redo_sections = []
+    if previous_input and previous_output:
+        incremental = st.checkbox(
+            "Only regenerate sections affected by my changes",
+            value=True,
+            key="incremental"
+        )
+        if incremental:
+            redo_sections = st.multiselect(
+                "Also regenerate",
+                SECTION_ORDER,
+                format_func=str.title,
+                key="redo_sections"
+            )
+            if all_inputs_provided:
+                new_input = {
+                    "base_resume": base_resume,
+                    "base_cover_letter": base_cover_letter,
+                    "job_description": job_description,
+                }
+                if needs_full_run(previous_input, previous_output, new_input):
+                    st.caption("All sections are affected; a full optimization will run.")
+                else:
+                    regenerate = sections_to_regenerate(changed_inputs(previous_input, new_input), redo_sections)
+                    if regenerate:
+                        st.caption("Will regenerate: " + ", ".join(section.title() for section in regenerate))
+                    else:
+                        st.caption("Nothing relevant changed; the previous results will be reused.")
+
     # Render the action button; it is disabled if not all inputs are provided
-    optimize_clicked = render_action_button(disabled=not all_inputs_provided)
+    # It is also disabled while this session's job runs, so a double click cannot queue it twice
+    optimize_clicked = render_action_button(
+        disabled=not all_inputs_provided or 'optimization_job_id' in st.session_state
+    )
     
-    # Process optimization when the Analyze button is clicked
+    # Queue the optimization in the background when the Analyze button is clicked
     if optimize_clicked:
         if all_inputs_provided:
-            progress_placeholder = st.empty()
-            progress_placeholder.info("Starting optimization process...")
-            try:
-                with st.spinner("Generating optimized materials..."):
-                    progress_placeholder.info("Analyzing job description and optimizing materials...")
-                    optimization_output = optimize_resume(
-                        base_resume=base_resume,
-                        base_cover_letter=base_cover_letter,
-                        job_description=job_description
-                    )
-                    # Log the output for debugging purposes
-                    print("Optimization Output:", optimization_output)
-                    progress_placeholder.success("Optimization complete!")
-                
-                # Save the optimization output and the original user input
-                st.session_state['optimization_output'] = optimization_output
-                st.session_state['user_input'] = {
-                    "base_resume": base_resume,
-                    "base_cover_letter": base_cover_letter,
-                    "job_description": job_description
-                }
-                
-                # Update the session state to switch to the Results view
-                st.session_state["active_tab"] = "Results"
-                st.rerun()  # Re-run the app so the UI immediately shows the Results
-            except Exception as e:
-                progress_placeholder.error(f"An error occurred: {str(e)}")
-                st.exception(e)
+            job_id = submit_optimization(
+                base_resume=base_resume,
+                base_cover_letter=base_cover_letter,
+                job_description=job_description,
+                parallel=parallel_sections,
+                previous_input=previous_input if incremental else None,
+                previous_output=previous_output if incremental else None,
+                redo=redo_sections,
+                context_owner=st.session_state['session_id']
+            )
+            st.session_state['optimization_job_id'] = job_id
+            # Keep the job ID in the URL so a page refresh can pick the job up again
+            st.query_params["job"] = job_id
+            st.rerun()
         else:
             st.error("Please fill in all text areas before running optimization.")
 
@@ -138,6 +276,10 @@ elif selected_tab == "Results":
     
     if 'optimization_output' in st.session_state:
         output = st.session_state['optimization_output']
+        regenerated_sections = st.session_state.get('regenerated_sections')
+        if regenerated_sections is not None and len(regenerated_sections) < len(SECTION_ORDER):
+            st.caption("Regenerated: " + (", ".join(section.title() for section in regenerated_sections) or "nothing")
+                       + ". All other sections were reused from the previous run.")
         # Using nested tabs for splitting up the results details
         tab1, tab2, tab3, tab4 = st.tabs(["Complete Output", "Resume", "Cover Letter", "ATS Analysis"])
 
@@ -155,10 +297,27 @@ elif selected_tab == "Results":
             st.markdown('</div>', unsafe_allow_html=True)
             st.markdown('</div>', unsafe_allow_html=True)
 
-        try:
-            # Process and render sections from the optimization output
-            resume_section = output.split("RESUME:")[1].split("COVER LETTER:")[0].strip()
-            processed_resume = remove_bullet_points_from_sections(resume_section)
+        # Parse the output once per response and reuse the result on every rerun
+        parsed = st.session_state.get('parsed_output')
+        if parsed is None or parsed.raw != output:
+            parsed = parse_optimization_output(output)
+            st.session_state['parsed_output'] = parsed
+
+        template = st.selectbox("Document template", sorted(TEMPLATES), index=sorted(TEMPLATES).index(DEFAULT_TEMPLATE),
+                                help="Layout used for the DOCX and PDF downloads")
+
+        if not parsed.has_section("RESUME") or not parsed.has_section("COVER LETTER"):
+            st.error("Error parsing optimization output: the RESUME: or COVER LETTER: section is missing.")
+        else:
+            processed_resume = parsed.processed_resume
+
+            with tab1:
+                st.download_button(
+                    label="Download All Documents (ZIP)",
+                    data=partial(export_zip, parsed, template=template),
+                    file_name="optimized_documents.zip",
+                    mime=ZIP_MIME
+                )
 
             with tab2:
                 st.markdown('<div class="results-card">', unsafe_allow_html=True)
@@ -170,10 +329,22 @@ elif selected_tab == "Results":
                     file_name="optimized_resume.txt",
                     mime="text/plain"
                 )
+                # Documents are rendered in memory only when their button is clicked
+                for file_format, (_, mime) in FORMATS.items():
+                    st.download_button(
+                        label=f"Download Resume ({file_format.upper()})",
+                        data=partial(export_document, parsed, "resume", file_format, template),
+                        file_name=f"optimized_resume.{file_format}",
+                        mime=mime
+                    )
+                unsupported = unsupported_pdf_characters(processed_resume)
+                if unsupported:
+                    st.warning("The PDF cannot show " + " ".join(unsupported[:10])
+                               + " (printed as '?'). Use the DOCX download to keep these characters.")
                 st.markdown('</div>', unsafe_allow_html=True)
                 st.markdown('</div>', unsafe_allow_html=True)
 
-            cover_letter_section = output.split("COVER LETTER:")[1].split("ATS COMPATIBILITY ANALYSIS:")[0].strip()
+            cover_letter_section = parsed.cover_letter
             with tab3:
                 st.markdown('<div class="results-card">', unsafe_allow_html=True)
                 st.text_area("Optimized Cover Letter", value=cover_letter_section, height=500)
@@ -184,23 +355,31 @@ elif selected_tab == "Results":
                     file_name="optimized_cover_letter.txt",
                     mime="text/plain"
                 )
+                # Documents are rendered in memory only when their button is clicked
+                for file_format, (_, mime) in FORMATS.items():
+                    st.download_button(
+                        label=f"Download Cover Letter ({file_format.upper()})",
+                        data=partial(export_document, parsed, "cover_letter", file_format, template),
+                        file_name=f"optimized_cover_letter.{file_format}",
+                        mime=mime
+                    )
+                unsupported = unsupported_pdf_characters(cover_letter_section)
+                if unsupported:
+                    st.warning("The PDF cannot show " + " ".join(unsupported[:10])
+                               + " (printed as '?'). Use the DOCX download to keep these characters.")
                 st.markdown('</div>', unsafe_allow_html=True)
                 st.markdown('</div>', unsafe_allow_html=True)
 
-            ats_section = ""
-            if "ATS COMPATIBILITY ANALYSIS:" in output:
-                ats_section = output.split("ATS COMPATIBILITY ANALYSIS:")[1].strip()
-                if "INTERVIEW PREPARATION:" in ats_section:
-                    ats_section = ats_section.split("INTERVIEW PREPARATION:")[0].strip()
-
-                markdown_content = ""
-                if "```markdown" in ats_section and "```" in ats_section.split("```markdown")[1]:
-                    markdown_content = ats_section.split("```markdown")[1].split("```")[0].strip()
-                else:
-                    markdown_content = ats_section
+            ats_section = parsed.ats_analysis
             with tab4:
                 st.markdown('<div class="results-card ats-analysis">', unsafe_allow_html=True)
-                st.markdown(markdown_content)
+                user_input = st.session_state.get('user_input', {})
+                if user_input.get("job_description"):
+                    render_ats_score(
+                        score_resume(processed_resume, user_input["job_description"]),
+                        baseline=score_resume(user_input.get("base_resume", ""), user_input["job_description"])
+                    )
+                st.markdown(parsed.ats_markdown)
                 st.markdown('<div class="download-button-container">', unsafe_allow_html=True)
                 st.download_button(
                     label="Download ATS Analysis",
@@ -210,7 +389,54 @@ elif selected_tab == "Results":
                 )
                 st.markdown('</div>', unsafe_allow_html=True)
                 st.markdown('</div>', unsafe_allow_html=True)
-        except Exception as e:
-            st.error(f"Error parsing optimization output: {str(e)}")
     else:
         st.info("No results to display yet. Please enter your resume, cover letter, and job description in the Data Entry view and click Analyze.")
+
+# --------------------------
+# History Section
+# --------------------------
+elif selected_tab == "History":
+    history = get_history_store()
+    if history is None:
+        st.info("History is disabled. Set HISTORY_PATH (e.g. .cache/history.sqlite3) to keep a record of "
+                "past runs; every session can see them, so only enable it for a personal deployment.")
+    else:
+        # Changing the search starts again from the first page
+        def reset_history_page():
+            st.session_state["history_page"] = 1
+
+        col1, col2, col3 = st.columns([2, 1, 1])
+        keywords = col1.text_input("Search", placeholder="Keywords, e.g. kubernetes data pipelines",
+                                   key="history_keywords", on_change=reset_history_page)
+        company = col2.text_input("Company", key="history_company", on_change=reset_history_page)
+        dates = col3.date_input("Date range", value=(), key="history_dates", on_change=reset_history_page)
+
+        # An open-ended range covers every run from its start date on
+        since = until = None
+        if len(dates) >= 1:
+            since = datetime.datetime.combine(dates[0], datetime.time.min).timestamp()
+        if len(dates) == 2:
+            until = datetime.datetime.combine(dates[1] + datetime.timedelta(days=1), datetime.time.min).timestamp()
+
+        results = history.search(keywords, company, since, until, page=st.session_state.get("history_page", 1))
+        if results["page"] > results["pages"]:
+            # The chosen page is past the end when fewer runs match than before
+            st.session_state["history_page"] = results["pages"]
+            results = history.search(keywords, company, since, until, page=results["pages"])
+
+        if not results["runs"]:
+            st.info("No past runs match your search.")
+        for run in results["runs"]:
+            with st.container(border=True):
+                st.markdown(f"**{run['job_title'] or 'Untitled position'}** — {run['company'] or 'Unknown company'}")
+                details = [format_timestamp(run["created_at"])]
+                if run["ats_score"] is not None:
+                    details.append(f"ATS {run['ats_score']:.0f} (base resume {run['baseline_ats_score']:.0f})")
+                if run["duration_seconds"] is not None:
+                    details.append(f"{run['duration_seconds']:.0f}s")
+                st.caption(" · ".join(details))
+                if st.button("Open", key=f"open_run_{run['id']}"):
+                    open_history_run(run["id"])
+
+        st.number_input("Page", min_value=1, max_value=results["pages"], step=1, key="history_page")
+        st.caption(f"Page {results['page']} of {results['pages']} · {results['total']} runs")
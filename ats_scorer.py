@@ -0,0 +1,197 @@
+# ats_scorer.py
+# This module contains a local, deterministic ATS keyword scorer.
+# It compares a resume against a job description without calling the LLM.
+
+import math
+import re
+
+# BM25 parameters used to saturate repeated resume terms
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Weight of skill-phrase coverage vs. general term coverage in the final score
+SKILL_WEIGHT = 0.4
+
+# Relative weight of bigrams vs. single words in term coverage
+BIGRAM_WEIGHT = 0.5
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each etc few for from further had has have
+having he her here hers him his how i if in into is it its itself just least less like may me more most
+must my no nor not now of off on once only or other our ours out over own per same shall she should so
+some such than that the their theirs them then there these they this those through to too under until
+up upon us very via was we were what when where which while who whom why will with within without would
+you your yours able across ability strong excellent good great new work working role team teams candidate
+candidates including include includes preferred required requirements requirement responsibilities
+qualifications experience years year plus using use used well related etc join looking seeking
+""".split())
+
+# Common skills and phrases matched verbatim (case-insensitive) in both documents
+SKILL_PHRASES = [
+    "python", "java", "javascript", "typescript", "c++", "c#", "golang", "rust", "ruby", "php",
+    "scala", "kotlin", "swift", "matlab", "sql", "nosql", "bash", "html", "css",
+    "react", "angular", "vue", "node.js", "django", "flask", "fastapi", "spring", "spring boot", ".net",
+    "rest api", "graphql", "grpc", "microservices", "event-driven architecture",
+    "aws", "azure", "gcp", "google cloud", "docker", "kubernetes", "terraform", "ansible", "jenkins",
+    "ci/cd", "github actions", "gitlab", "git", "linux", "unix", "serverless", "lambda",
+    "postgresql", "mysql", "mongodb", "redis", "elasticsearch", "kafka", "rabbitmq", "spark", "hadoop",
+    "airflow", "snowflake", "databricks", "bigquery", "etl", "data pipelines", "data warehouse",
+    "machine learning", "deep learning", "nlp", "natural language processing", "computer vision",
+    "pytorch", "tensorflow", "scikit-learn", "pandas", "numpy", "llm", "generative ai",
+    "data analysis", "data visualization", "tableau", "power bi", "excel", "statistics", "a/b testing",
+    "agile", "scrum", "kanban", "jira", "project management", "product management", "stakeholder management",
+    "cross-functional", "leadership", "mentoring", "communication", "problem solving", "budgeting",
+    "unit testing", "test automation", "tdd", "devops", "sre", "observability", "monitoring",
+    "security", "oauth", "networking", "distributed systems", "system design", "performance tuning",
+    "salesforce", "sap", "crm", "seo", "content strategy", "customer success", "ux", "ui", "figma",
+]
+
+# Tokens may contain inner punctuation used by technology names (node.js, c++, ci/cd)
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./\-]*[a-z0-9+#]|[a-z0-9]")
+_SENTENCE_SPLIT_RE = re.compile(r"[\n.;!?]+\s*")
+
+
+class KeywordIndex:
+    """
+    A set of phrases compiled once into a single alternation regex.
+
+    Longer phrases are tried first so that "spring boot" wins over "spring".
+    """
+
+    def __init__(self, phrases):
+        self.phrases = sorted({phrase.lower() for phrase in phrases}, key=len, reverse=True)
+        alternation = "|".join(re.escape(phrase) for phrase in self.phrases)
+        # Custom boundaries because \b does not work next to symbols like "+" or "#"
+        self._pattern = re.compile(rf"(?<![a-z0-9+#])(?:{alternation})(?![a-z0-9+#])")
+
+    def find(self, text):
+        """
+        Return the set of indexed phrases that occur in text.
+        """
+        return set(self._pattern.findall(text.lower()))
+
+
+DEFAULT_KEYWORD_INDEX = KeywordIndex(SKILL_PHRASES)
+
+
+def tokenize(text):
+    """
+    Lowercase and split text into tokens, dropping stopwords and bare numbers.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    return [token for token in tokens if token not in STOPWORDS and not token.isdigit()]
+
+
+def extract_terms(text):
+    """
+    Return unigrams plus bigrams, built within sentences so they do not span boundaries.
+    """
+    terms = []
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        tokens = tokenize(sentence)
+        terms.extend(tokens)
+        terms.extend(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    return terms
+
+
+def _term_counts(terms):
+    counts = {}
+    for term in terms:
+        counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+def score_resume(resume_text, job_description, keyword_index=None, top_n=15):
+    """
+    Score how well a resume covers the terms and skills in a job description.
+
+    Job description terms are weighted by sublinear term frequency times an IDF
+    computed over the job description's sentences, so terms repeated in every
+    boilerplate sentence count less. Resume matches use BM25 term-frequency
+    saturation. Skill phrases from the keyword index are scored separately.
+
+    Returns:
+    - A dictionary with the 0-100 "score", "term_coverage", "skill_coverage",
+      "cosine_similarity", "matched_skills", "missing_skills" and "missing_terms"
+    """
+    # NumPy is imported on first use to keep app start-up fast
+    import numpy as np
+
+    keyword_index = keyword_index or DEFAULT_KEYWORD_INDEX
+    resume_text = resume_text or ""
+    job_description = job_description or ""
+
+    jd_sentences = [s for s in _SENTENCE_SPLIT_RE.split(job_description) if s.strip()]
+    jd_counts = _term_counts(extract_terms(job_description))
+    resume_terms = extract_terms(resume_text)
+    resume_counts = _term_counts(resume_terms)
+
+    result = {
+        "score": 0,
+        "term_coverage": 0.0,
+        "skill_coverage": 0.0,
+        "cosine_similarity": 0.0,
+        "matched_skills": [],
+        "missing_skills": [],
+        "missing_terms": [],
+    }
+    if not jd_counts:
+        return result
+
+    vocabulary = list(jd_counts)
+    jd_tf = np.array([jd_counts[term] for term in vocabulary], dtype=np.float64)
+    resume_tf = np.array([resume_counts.get(term, 0) for term in vocabulary], dtype=np.float64)
+
+    # IDF over job description sentences
+    sentence_term_sets = [set(extract_terms(sentence)) for sentence in jd_sentences]
+    document_frequency = np.array(
+        [sum(term in terms for terms in sentence_term_sets) for term in vocabulary], dtype=np.float64
+    )
+    sentence_count = max(len(sentence_term_sets), 1)
+    idf = np.log((sentence_count - document_frequency + 0.5) / (document_frequency + 0.5) + 1.0)
+
+    is_bigram = np.array([" " in term for term in vocabulary])
+    jd_weights = (1.0 + np.log(jd_tf)) * idf * np.where(is_bigram, BIGRAM_WEIGHT, 1.0)
+
+    # BM25 saturation of resume term frequencies. A single mention in an average-length
+    # document scores 1.0; the value is capped there so repetition cannot inflate coverage.
+    resume_length = len(resume_terms)
+    average_length = (resume_length + sum(jd_counts.values())) / 2.0 or 1.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * resume_length / average_length)
+    resume_saturation = np.minimum(resume_tf * (BM25_K1 + 1) / (resume_tf + norm), 1.0)
+
+    term_coverage = float(np.dot(jd_weights, resume_saturation) / jd_weights.sum())
+
+    resume_weights = np.where(resume_tf > 0, (1.0 + np.log(np.maximum(resume_tf, 1.0))) * idf, 0.0)
+    resume_weights *= np.where(is_bigram, BIGRAM_WEIGHT, 1.0)
+    denominator = np.linalg.norm(jd_weights) * np.linalg.norm(resume_weights)
+    cosine_similarity = float(np.dot(jd_weights, resume_weights) / denominator) if denominator else 0.0
+
+    jd_skills = keyword_index.find(job_description)
+    resume_skills = keyword_index.find(resume_text)
+    matched_skills = sorted(jd_skills & resume_skills)
+    missing_skills = sorted(jd_skills - resume_skills)
+
+    if jd_skills:
+        skill_coverage = len(matched_skills) / len(jd_skills)
+        combined = (1 - SKILL_WEIGHT) * term_coverage + SKILL_WEIGHT * skill_coverage
+    else:
+        skill_coverage = 0.0
+        combined = term_coverage
+
+    # Highest-weighted job description words that never appear in the resume
+    is_missing = (resume_tf == 0) & ~is_bigram
+    missing_order = np.argsort(-np.where(is_missing, jd_weights, -math.inf), kind="stable")
+    missing_terms = [vocabulary[i] for i in missing_order[:top_n] if is_missing[i]]
+
+    result.update({
+        "score": int(round(100 * combined)),
+        "term_coverage": round(term_coverage, 4),
+        "skill_coverage": round(skill_coverage, 4),
+        "cosine_similarity": round(cosine_similarity, 4),
+        "matched_skills": matched_skills,
+        "missing_skills": missing_skills,
+        "missing_terms": missing_terms,
+    })
+    return result
@@ -0,0 +1,235 @@
+# batch.py
+# This module optimizes one resume/cover letter against many job descriptions
+# with bounded concurrency, rate limiting and retries.
+#
+# Usage:
+#   python batch.py --resume resume.pdf --cover-letter cover.txt --jobs jobs/ --output results.jsonl
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from history import record_run
+from utils import extract_text_from_file
+
+# Extensions read from a job description directory
+JOB_FILE_EXTENSIONS = (".txt", ".md", ".pdf", ".docx")
+
+
+class LocalFile(io.BytesIO):
+    """
+    Minimal stand-in for Streamlit's UploadedFile so local files can go through
+    extract_text_from_file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+
+
+def check_document_text(text, label="document"):
+    """
+    Raise ValueError if text is empty or is one of extract_text_from_file's error messages.
+    """
+    if text == "Unsupported file format" or text.startswith("Error extracting text:"):
+        raise ValueError(f"Could not read the {label}: {text}")
+    if not text.strip():
+        raise ValueError(f"The {label} is empty")
+    return text
+
+
+def _read_text(path):
+    if path.lower().endswith(".md"):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    return extract_text_from_file(LocalFile(path))
+
+
+def read_document(path, label="document"):
+    """
+    Read a resume, cover letter or job description from disk as plain text.
+
+    Raises ValueError if the file cannot be read or contains no text.
+    """
+    return check_document_text(_read_text(path), f"{label} {path}")
+
+
+def load_job_descriptions(source):
+    """
+    Load job descriptions from a directory of files or a JSONL file.
+
+    JSONL lines must contain a "job_description" (or "text") field and may
+    contain an "id" field; otherwise the line number is used.
+
+    Unreadable files and empty descriptions are kept as they are, so run_batch
+    records them as failed jobs (see check_document_text).
+
+    Returns:
+    - A list of (job_id, job_description) tuples
+    """
+    jobs = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if os.path.isfile(path) and name.lower().endswith(JOB_FILE_EXTENSIONS):
+                jobs.append((os.path.splitext(name)[0], _read_text(path)))
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                text = record.get("job_description") or record.get("text") or ""
+                jobs.append((str(record.get("id", line_number)), text))
+    return jobs
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting how many requests start per second.
+    """
+
+    def __init__(self, rate_per_second, capacity=None):
+        self.rate = rate_per_second
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_second)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then consume it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def call_with_retry(func, *args, max_retries=4, base_delay=1.0, max_delay=30.0, rate_limiter=None, **kwargs):
+    """
+    Call func, retrying failures with exponential backoff and full jitter.
+
+    Returns:
+    - (result, attempts) on success; the last exception is re-raised after max_retries
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return func(*args, **kwargs), attempt
+        except Exception:
+            if attempt > max_retries:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1))))
+
+
+def run_batch(base_resume, base_cover_letter, jobs, output_path, concurrency=4,
+              requests_per_minute=30, max_retries=4, optimize_func=None):
+    """
+    Optimize the resume and cover letter against every job description.
+
+    Each result is appended to output_path as one JSON line as soon as its job
+    finishes, so partial results are kept if the run is interrupted.
+
+    Returns:
+    - A summary dictionary with succeeded/failed counts and elapsed time
+    """
+    if optimize_func is None:
+        from ai_services import optimize_resume
+        optimize_func = optimize_resume
+
+    rate_limiter = TokenBucket(requests_per_minute / 60.0, capacity=concurrency) if requests_per_minute else None
+    summary = {"total": len(jobs), "succeeded": 0, "failed": 0}
+    started = time.perf_counter()
+
+    def process(job_id, job_description):
+        job_started = time.perf_counter()
+        try:
+            # Unreadable or empty job descriptions fail here, before any model call
+            check_document_text(job_description, "job description")
+            output, attempts = call_with_retry(
+                optimize_func,
+                base_resume=base_resume,
+                base_cover_letter=base_cover_letter,
+                job_description=job_description,
+                max_retries=max_retries,
+                rate_limiter=rate_limiter,
+            )
+            record = {"id": job_id, "status": "ok", "attempts": attempts, "output": output}
+            user_input = {
+                "base_resume": base_resume,
+                "base_cover_letter": base_cover_letter,
+                "job_description": job_description,
+            }
+            record_run(user_input, output, duration_seconds=time.perf_counter() - job_started, source="batch")
+        except Exception as e:
+            record = {"id": job_id, "status": "error", "error": str(e)}
+        record["elapsed_seconds"] = round(time.perf_counter() - job_started, 3)
+        return record
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(process, job_id, text) for job_id, text in jobs]
+        for future in as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            summary["succeeded" if record["status"] == "ok" else "failed"] += 1
+
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimize a resume against many job descriptions.")
+    parser.add_argument("--resume", required=True, help="Base resume file (txt, md, pdf, docx)")
+    parser.add_argument("--cover-letter", required=True, help="Base cover letter file (txt, md, pdf, docx)")
+    parser.add_argument("--jobs", required=True, help="Directory of job description files or a JSONL file")
+    parser.add_argument("--output", default="batch_results.jsonl", help="Output JSONL file (appended to)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of requests in flight")
+    parser.add_argument("--rpm", type=float, default=30, help="Maximum requests started per minute (0 to disable)")
+    parser.add_argument("--retries", type=int, default=4, help="Retries per job after the first attempt")
+    args = parser.parse_args(argv)
+
+    jobs = load_job_descriptions(args.jobs)
+    if not jobs:
+        print(f"No job descriptions found in {args.jobs}", file=sys.stderr)
+        return 1
+
+    try:
+        base_resume = read_document(args.resume, "resume")
+        base_cover_letter = read_document(args.cover_letter, "cover letter")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    summary = run_batch(
+        base_resume,
+        base_cover_letter,
+        jobs,
+        args.output,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        max_retries=args.retries,
+    )
+    print(json.dumps(summary))
+    return 0 if summary["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# benchmarks/bench_parsing.py
+# Compare the legacy repeated str.split parsing of model output with the
+# single-pass parse_optimization_output on large synthetic responses.
+#
+# Usage:
+#   python benchmarks/bench_parsing.py [--lines 10000] [--repeat 20]
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from utils import parse_optimization_output
+
+
+def make_output(lines):
+    """
+    Build a synthetic model response with a resume of roughly the given number of lines.
+    """
+    resume = ["John Doe", "SUMMARY", "Engineer with broad experience."]
+    sections = ["SKILLS", "EXPERIENCE", "PROJECTS", "EDUCATION"]
+    for i in range(lines):
+        if i % 50 == 0:
+            resume.append(sections[(i // 50) % len(sections)])
+        resume.append(f"• Delivered improvement {i} by optimizing systems and processes by {i % 90}%")
+    return (
+        "Here is your output:\nRESUME:\n" + "\n".join(resume)
+        + "\n\nCOVER LETTER:\n" + "Dear Hiring Manager,\n" + "I am excited to apply. " * 200
+        + "\n\nATS COMPATIBILITY ANALYSIS:\n```markdown\n## ATS Compatibility Analysis\n"
+        + "### Estimated ATS Passing Percentage: 88%\n```\n\n"
+        + "INTERVIEW PREPARATION:\n1. Talk about scale.\n2. Talk about teams.\n"
+    )
+
+
+def legacy_remove_bullet_points(resume_text):
+    lines = resume_text.split('\n')
+    processed_lines = []
+    in_target_section = False
+    for line in lines:
+        if re.search(r'^(SKILLS|TECHNICAL SKILLS|EXPERTISE|CORE COMPETENCIES|KEY SKILLS)', line.strip().upper()):
+            in_target_section = True
+            processed_lines.append(line)
+        elif re.search(r'^(EXPERIENCE|WORK EXPERIENCE|PROFESSIONAL EXPERIENCE|EMPLOYMENT HISTORY)', line.strip().upper()):
+            in_target_section = True
+            processed_lines.append(line)
+        elif re.search(r'^(EDUCATION|PROJECTS|ACHIEVEMENTS|CERTIFICATIONS|LANGUAGES|INTERESTS)', line.strip().upper()):
+            in_target_section = False
+            processed_lines.append(line)
+        elif in_target_section:
+            processed_lines.append(re.sub(r'^[\s]*[•\-\*\+◦◘○◙♦❖⬧➢➤➔➧►❯❱]+\s*', '', line))
+        else:
+            processed_lines.append(line)
+    return '\n'.join(processed_lines)
+
+
+def legacy_parse(output):
+    """
+    The Results view parsing as it was before ParsedOutput.
+    """
+    resume_section = output.split("RESUME:")[1].split("COVER LETTER:")[0].strip()
+    processed_resume = legacy_remove_bullet_points(resume_section)
+    cover_letter_section = output.split("COVER LETTER:")[1].split("ATS COMPATIBILITY ANALYSIS:")[0].strip()
+    ats_section = output.split("ATS COMPATIBILITY ANALYSIS:")[1].strip()
+    if "INTERVIEW PREPARATION:" in ats_section:
+        ats_section = ats_section.split("INTERVIEW PREPARATION:")[0].strip()
+    if "```markdown" in ats_section and "```" in ats_section.split("```markdown")[1]:
+        markdown_content = ats_section.split("```markdown")[1].split("```")[0].strip()
+    else:
+        markdown_content = ats_section
+    return processed_resume, cover_letter_section, ats_section, markdown_content
+
+
+def new_parse(output):
+    parsed = parse_optimization_output(output)
+    return parsed.processed_resume, parsed.cover_letter, parsed.ats_analysis, parsed.ats_markdown
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"{'lines':>8} {'legacy ms':>10} {'single-pass ms':>15} {'speedup':>8}")
+    for lines in args.lines:
+        output = make_output(lines)
+        assert legacy_parse(output) == new_parse(output)
+        legacy = min(timeit.repeat(lambda: legacy_parse(output), number=1, repeat=args.repeat)) * 1000
+        single = min(timeit.repeat(lambda: new_parse(output), number=1, repeat=args.repeat)) * 1000
+        print(f"{lines:>8} {legacy:>10.2f} {single:>15.2f} {legacy / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
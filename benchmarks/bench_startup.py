@@ -0,0 +1,61 @@
+# benchmarks/bench_startup.py
+# Measure cold-start import time of the app modules in fresh interpreters,
+# compared with eagerly importing the heavy dependencies (Gemini SDK, PyPDF2,
+# python-docx, NumPy) as the app used to do, plus cached vs. uncached CSS loads.
+#
+# Usage:
+#   python benchmarks/bench_startup.py [--repeat 5]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+
+APP_MODULES = "ai_services, utils, ui_components, jobs, ats_scorer"
+HEAVY_MODULES = "google.generativeai, PyPDF2, docx, numpy"
+
+SCENARIOS = {
+    "lazy (current app imports)": f"import {APP_MODULES}",
+    "eager (app + heavy deps)": f"import {APP_MODULES}, {HEAVY_MODULES}",
+    "first model client": f"import {APP_MODULES}; ai_services.resolve_provider('gemini').model",
+}
+
+
+def time_in_fresh_interpreter(statement):
+    code = (
+        "import time, warnings; warnings.simplefilter('ignore'); t = time.perf_counter(); "
+        f"{statement}; print(time.perf_counter() - t)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'scenario':<30} {'median ms':>10} {'min ms':>8}")
+    for name, statement in SCENARIOS.items():
+        timings = [time_in_fresh_interpreter(statement) * 1000 for _ in range(args.repeat)]
+        print(f"{name:<30} {statistics.median(timings):>10.1f} {min(timings):>8.1f}")
+
+    from ui_components import _read_css, load_css
+
+    css_path = os.path.join(ROOT, "styles.css")
+    uncached = min(timeit.repeat(lambda: _read_css.__wrapped__(css_path, 0), number=100, repeat=5)) * 10
+    load_css(css_path)
+    cached = min(timeit.repeat(lambda: load_css(css_path), number=100, repeat=5)) * 10
+    print(f"{'load_css (uncached read)':<30} {uncached:>10.3f}")
+    print(f"{'load_css (cached)':<30} {cached:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
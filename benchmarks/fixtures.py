@@ -0,0 +1,161 @@
+# benchmarks/fixtures.py
+# Deterministic fixture corpora for the benchmark suite: multi-page PDFs,
+# large DOCX files, long resumes and synthetic model responses.
+#
+# Fixtures are generated from a fixed seed, so every run (and every machine)
+# benchmarks the same bytes. Files are written once to a fixtures directory
+# and reused on later runs.
+
+import os
+import random
+
+SEED = 1234
+
+SKILLS = ["Python", "SQL", "AWS", "Docker", "Kubernetes", "Airflow", "Spark", "Terraform",
+          "React", "TypeScript", "PostgreSQL", "Kafka", "GraphQL", "Pandas", "CI/CD", "Linux"]
+VERBS = ["Built", "Led", "Designed", "Migrated", "Optimized", "Automated", "Scaled", "Delivered"]
+OBJECTS = ["data pipelines", "payment services", "search infrastructure", "reporting dashboards",
+           "deployment tooling", "customer APIs", "ML feature stores", "billing systems"]
+BULLETS = ["•", "-", "*", "➤", "►"]
+RESUME_SECTIONS = ["SKILLS", "EXPERIENCE", "PROJECTS", "EDUCATION", "CERTIFICATIONS"]
+
+
+def _bullet_line(rng, index):
+    return (f"{rng.choice(BULLETS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} with "
+            f"{rng.choice(SKILLS)} and {rng.choice(SKILLS)}, improving throughput by {index % 90 + 5}%")
+
+
+def make_resume(lines, seed=SEED):
+    """
+    Build a plain-text resume of exactly the given number of lines, with a section
+    header every 50 lines and bulleted achievements in between.
+    """
+    rng = random.Random(seed)
+    resume = ["Jane Doe", "Senior Software Engineer | jane@example.com"]
+    for i in range(max(lines - len(resume), 0)):
+        if i % 50 == 0:
+            resume.append(RESUME_SECTIONS[(i // 50) % len(RESUME_SECTIONS)])
+        else:
+            resume.append(_bullet_line(rng, i))
+    return "\n".join(resume[:lines])
+
+
+def make_job_description(paragraphs=8, seed=SEED):
+    """
+    Build a job description with requirements, responsibilities and boilerplate.
+    """
+    rng = random.Random(seed)
+    parts = ["Senior Data Engineer at Example Corp", "About us",
+             "Example Corp is a fast-growing company on a mission to make data useful."]
+    for _ in range(paragraphs):
+        parts.append("Requirements: " + ", ".join(rng.sample(SKILLS, 5)) + ".")
+        parts.append(f"You will {rng.choice(VERBS).lower()} {rng.choice(OBJECTS)} for our customers.")
+    parts.append("Equal opportunity employer. We value diversity and inclusion.")
+    return "\n".join(parts)
+
+
+def make_llm_response(resume_lines, seed=SEED, preamble="Here is your optimized material:\n"):
+    """
+    Build a synthetic model response in the RESUME:/COVER LETTER:/... layout.
+    """
+    rng = random.Random(seed)
+    interview = "\n".join(f"{i + 1}. Be ready to discuss {rng.choice(OBJECTS)}." for i in range(10))
+    return (
+        preamble + "RESUME:\n" + make_resume(resume_lines, seed)
+        + "\n\nCOVER LETTER:\nDear Hiring Manager,\n" + "I am excited to apply for this role. " * 40
+        + "\n\nATS COMPATIBILITY ANALYSIS:\n```markdown\n## ATS Compatibility Analysis\n"
+        + "### Estimated ATS Passing Percentage: 87%\n"
+        + "\n".join(f"- {skill}: present" for skill in SKILLS) + "\n```\n\n"
+        + "INTERVIEW PREPARATION:\n" + interview + "\n"
+    )
+
+
+def iter_chunks(text, chunk_chars=64):
+    """
+    Split text into fixed-size chunks, the way a streaming model response arrives.
+    """
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars]
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages, lines_per_page=40, seed=SEED):
+    """
+    Build a minimal but valid PDF with the given number of text pages.
+
+    Written by hand (one content stream per page, Helvetica, uncompressed) so no
+    PDF authoring library is needed to generate fixtures.
+    """
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        lines = [f"Page {page + 1}"] + [_bullet_line(rng, i).lstrip("•➤►*- ") for i in range(lines_per_page)]
+        operations = ["BT", "/F1 10 Tf", "12 TL", "50 760 Td"]
+        operations.extend(f"({_pdf_escape(line)}) '" for line in lines)
+        operations.append("ET")
+        content = "\n".join(operations).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = ("<< /Type /Pages /Kids [%s] /Count %d >>"
+                  % (" ".join(f"{kid} 0 R" for kid in kids), pages)).encode("ascii")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def make_docx(path, paragraphs, table_rows=0, seed=SEED):
+    """
+    Write a DOCX resume with the given number of paragraphs and an optional skills table.
+    """
+    from docx import Document
+
+    rng = random.Random(seed)
+    document = Document()
+    document.add_heading("Jane Doe", level=1)
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            document.add_heading(RESUME_SECTIONS[(i // 50) % len(RESUME_SECTIONS)], level=2)
+        else:
+            document.add_paragraph(_bullet_line(rng, i))
+    if table_rows:
+        table = document.add_table(rows=table_rows, cols=3)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = rng.choice(SKILLS)
+    document.save(path)
+
+
+def ensure_fixture(directory, name, build):
+    """
+    Return the path of a fixture file, generating it with build(path) if it does not exist yet.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        temporary_path = path + ".tmp"
+        build(temporary_path)
+        os.replace(temporary_path, path)
+    return path
+
+
+def write_bytes(data):
+    def build(path):
+        with open(path, "wb") as f:
+            f.write(data() if callable(data) else data)
+    return build
@@ -0,0 +1,81 @@
+# benchmarks/load_test.py
+# Load-test the optimization pipeline offline against the local stub provider,
+# or compare real providers on latency and estimated cost.
+#
+# Usage:
+#   python benchmarks/load_test.py --requests 200 --concurrency 1 8 32
+#   python benchmarks/load_test.py --providers gemini openai --requests 3 --concurrency 1
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ai_services import build_prompt, optimize_resume
+from llm_providers import StubProvider, get_provider
+
+RESUME = "Jane Doe\nSKILLS\n- Python\n- SQL\nEXPERIENCE\n- Built data pipelines at Acme\n" * 5
+COVER_LETTER = "Dear Hiring Manager,\nI am a data engineer with a passion for reliable systems.\n"
+JOB_DESCRIPTION = ("Data Engineer at Example Corp. Requirements: Python, SQL, Airflow and AWS. "
+                   "You will build and maintain data pipelines.\n") * 5
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(provider, requests, concurrency):
+    """
+    Issue requests uncached optimizations with the given concurrency.
+
+    Returns:
+    - (wall_seconds, per-request latencies in seconds, one sample output)
+    """
+    def one(index):
+        started = time.perf_counter()
+        # Vary the job description so every request is distinct
+        output = optimize_resume(RESUME, COVER_LETTER, f"{JOB_DESCRIPTION}\nPosting #{index}",
+                                 use_cache=False, provider=provider)
+        return time.perf_counter() - started, output
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(requests)))
+    return time.perf_counter() - started, [latency for latency, _ in results], results[0][1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--providers", nargs="+", default=["stub"], help="Provider names to compare")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="Stub time to first token (s)")
+    parser.add_argument("--stub-tps", type=float, default=500, help="Stub tokens per second")
+    args = parser.parse_args(argv)
+
+    print(f"{'provider':<10} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'cost/req':>10}")
+    for name in args.providers:
+        if name == "stub":
+            provider = StubProvider(first_token_latency=args.stub_latency, tokens_per_second=args.stub_tps)
+        else:
+            provider = get_provider(name)
+        for concurrency in args.concurrency:
+            wall, latencies, sample = run(provider, args.requests, concurrency)
+            cost = provider.estimate_cost(build_prompt(RESUME, COVER_LETTER, JOB_DESCRIPTION), sample)
+            print(f"{name:<10} {concurrency:>5} {args.requests / wall:>8.1f} "
+                  f"{statistics.median(latencies) * 1000:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} "
+                  f"{'n/a' if cost is None else f'${cost:.5f}':>10}")
+
+        if name == "stub":
+            # Time spent in the app itself: total latency minus the simulated model time
+            stub_time = provider.simulated_seconds(build_prompt(RESUME, COVER_LETTER, JOB_DESCRIPTION))
+            print(f"{'':<10} app overhead per request ~{(statistics.median(latencies) - stub_time) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# benchmarks/run_benchmarks.py
+# Reproducible benchmark suite for the hot paths: file extraction, bullet
+# cleanup, model output parsing (batch and streamed replay) and an end-to-end
+# run against the local stub model. Reports time, throughput and peak memory
+# per case and compares the results against stored baselines.
+#
+# Usage:
+#   python benchmarks/run_benchmarks.py                       (quick profile, compare to baselines)
+#   python benchmarks/run_benchmarks.py --profile full        (adds 500-page PDFs and 10k-line resumes)
+#   python benchmarks/run_benchmarks.py --only pdf parse      (cases whose name contains a filter)
+#   python benchmarks/run_benchmarks.py --save-baseline       (record the current numbers)
+#
+# Exits with status 1 if any case is slower or uses more memory than its
+# baseline by more than --tolerance.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import fixtures
+from batch import LocalFile
+from utils import StreamingSectionParser, extract_text_from_file, parse_optimization_output, \
+    remove_bullet_points_from_sections
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES_DIR = os.path.join(BENCHMARK_DIR, ".fixtures")
+DEFAULT_BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baselines.json")
+
+# Fixture sizes per profile
+PROFILES = {
+    "quick": {"pdf_pages": [1, 50], "resume_lines": [1000], "docx_paragraphs": [2000], "e2e_requests": 5},
+    "full": {"pdf_pages": [1, 50, 500], "resume_lines": [1000, 10000], "docx_paragraphs": [2000, 20000],
+             "e2e_requests": 20},
+}
+
+
+class Case:
+    """
+    One benchmark: run() is timed, and work / seconds is reported as throughput in unit/s.
+    """
+
+    def __init__(self, name, run, work, unit, repeat=5):
+        self.name = name
+        self.run = run
+        self.work = work
+        self.unit = unit
+        self.repeat = repeat
+
+
+def build_cases(profile, fixtures_dir):
+    """
+    Generate (or reuse) the fixture files for profile and return the benchmark cases.
+    """
+    sizes = PROFILES[profile]
+    cases = []
+
+    for pages in sizes["pdf_pages"]:
+        path = fixtures.ensure_fixture(fixtures_dir, f"resume_{pages}p.pdf",
+                                       fixtures.write_bytes(lambda pages=pages: fixtures.make_pdf(pages)))
+        upload = LocalFile(path)
+        cases.append(Case(f"extract_pdf_{pages}p",
+                          lambda upload=upload: extract_text_from_file(upload, use_cache=False),
+                          pages, "pages", repeat=3 if pages >= 100 else 5))
+
+    for paragraphs in sizes["docx_paragraphs"]:
+        path = fixtures.ensure_fixture(
+            fixtures_dir, f"resume_{paragraphs}para.docx",
+            lambda path, paragraphs=paragraphs: fixtures.make_docx(path, paragraphs, table_rows=50),
+        )
+        upload = LocalFile(path)
+        cases.append(Case(f"extract_docx_{paragraphs}para",
+                          lambda upload=upload: extract_text_from_file(upload, use_cache=False),
+                          os.path.getsize(path) / 1e6, "MB"))
+
+    for lines in sizes["resume_lines"]:
+        resume = fixtures.make_resume(lines)
+        path = fixtures.ensure_fixture(fixtures_dir, f"resume_{lines}lines.txt",
+                                       fixtures.write_bytes(resume.encode("utf-8")))
+        upload = LocalFile(path)
+        cases.append(Case(f"extract_txt_{lines}lines",
+                          lambda upload=upload: extract_text_from_file(upload, use_cache=False),
+                          lines, "lines"))
+        cases.append(Case(f"remove_bullets_{lines}lines",
+                          lambda resume=resume: remove_bullet_points_from_sections(resume), lines, "lines"))
+
+        # Replay a synthetic model response through the Results parsing path
+        response = fixtures.make_llm_response(lines)
+        cases.append(Case(f"parse_output_{lines}lines",
+                          lambda response=response: parse_optimization_output(response), lines, "lines"))
+        chunks = list(fixtures.iter_chunks(response))
+        cases.append(Case(f"stream_parse_{lines}lines",
+                          lambda chunks=chunks: _replay_stream(chunks), len(chunks), "chunks"))
+
+    requests = sizes["e2e_requests"]
+    cases.append(Case(f"end_to_end_stub_{requests}req", lambda: _end_to_end(requests, fixtures_dir),
+                      requests, "req", repeat=3))
+    return cases
+
+
+def _replay_stream(chunks):
+    parser = StreamingSectionParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.finish()
+    return parse_optimization_output(parser.output)
+
+
+def _end_to_end(requests, fixtures_dir):
+    """
+    Extract an uploaded resume, optimize it with a zero-latency stub model and parse the result.
+    """
+    from ai_services import optimize_resume
+    from llm_providers import StubProvider
+
+    provider = StubProvider(first_token_latency=0, tokens_per_second=0)
+    upload = LocalFile(fixtures.ensure_fixture(fixtures_dir, "resume_1p.pdf",
+                                               fixtures.write_bytes(lambda: fixtures.make_pdf(1))))
+    job_description = fixtures.make_job_description()
+    for index in range(requests):
+        resume = extract_text_from_file(upload, use_cache=False)
+        output = optimize_resume(resume, "Dear Hiring Manager,\nI build reliable systems.",
+                                 f"{job_description}\nPosting #{index}", use_cache=False, provider=provider)
+        parse_optimization_output(output).processed_resume
+
+
+def measure(case):
+    """
+    Time case.run (one warm-up, then case.repeat runs) and measure its peak traced memory.
+
+    Memory is measured in a separate run because tracemalloc slows allocation-heavy code.
+    Allocations in worker processes (large PDFs) are not included.
+    """
+    case.run()
+    timings = []
+    for _ in range(case.repeat):
+        started = time.perf_counter()
+        case.run()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "median_ms": median * 1000,
+        "min_ms": min(timings) * 1000,
+        "throughput": case.work / median if median else 0.0,
+        "unit": case.unit,
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def compare(results, baselines, tolerance):
+    """
+    Returns:
+    - A dictionary mapping case name to a list of regression descriptions (empty if within tolerance)
+    """
+    regressions = {}
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        problems = []
+        # The fastest run is the least noisy estimate of the code's cost
+        for metric in ("min_ms", "peak_memory_kb"):
+            if baseline[metric] and result[metric] > baseline[metric] * (1 + tolerance):
+                problems.append(f"{metric} {result[metric]:.1f} vs baseline {baseline[metric]:.1f}")
+        regressions[name] = problems
+    return regressions
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("cases", {})
+
+
+def save_baselines(path, results, profile):
+    cases = load_baselines(path)
+    cases.update(results)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "machine": f"{platform.system()} {platform.machine()}, Python {platform.python_version()}",
+            "profile": profile,
+            "cases": {name: {key: round(value, 3) if isinstance(value, float) else value
+                             for key, value in result.items()}
+                      for name, result in sorted(cases.items())},
+        }, f, indent=2)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare against baselines.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", nargs="+", help="Only run cases whose name contains one of these strings")
+    parser.add_argument("--fixtures-dir", default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown/memory growth (0.25 = 25%%)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    cases = build_cases(args.profile, args.fixtures_dir)
+    if args.only:
+        cases = [case for case in cases if any(part in case.name for part in args.only)]
+
+    baselines = load_baselines(args.baseline)
+    results = {}
+    print(f"{'case':<28} {'median ms':>10} {'throughput':>18} {'peak KB':>10} {'min vs base':>12}")
+    for case in cases:
+        result = measure(case)
+        results[case.name] = result
+        baseline = baselines.get(case.name)
+        change = f"{result['min_ms'] / baseline['min_ms'] - 1:+.0%}" if baseline else "new"
+        print(f"{case.name:<28} {result['median_ms']:>10.2f} "
+              f"{result['throughput']:>12.1f} {case.unit + '/s':<5} {result['peak_memory_kb']:>10.0f} {change:>12}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        save_baselines(args.baseline, results, args.profile)
+        print(f"Saved baselines to {args.baseline}")
+        return 0
+
+    regressions = {name: problems for name, problems in compare(results, baselines, args.tolerance).items()
+                   if problems}
+    for name, problems in regressions.items():
+        print(f"REGRESSION {name}: " + "; ".join(problems))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
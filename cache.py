@@ -0,0 +1,383 @@
+# cache.py
+# This module contains a content-addressed cache with pluggable storage tiers
+# (an in-process LRU and a persistent SQLite file) used to avoid repeat LLM calls,
+# and a single-flight coalescer that shares one in-flight call between
+# concurrent identical requests
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from tracing import increment
+
+# Default location of the on-disk cache tier (relative to the working directory)
+DEFAULT_CACHE_DIR = ".cache"
+
+
+def normalize_text(text):
+    """
+    Normalize text so that inputs differing only in whitespace hash identically.
+    """
+    if not text:
+        return ""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    # Strip trailing whitespace on every line and collapse runs of blank lines
+    lines = [line.rstrip() for line in text.split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def make_cache_key(*parts, **params):
+    """
+    Build a stable SHA-256 cache key from text parts and keyword parameters.
+    """
+    payload = json.dumps({"parts": list(parts), "params": params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory tier with size (entry count) and TTL eviction.
+    """
+
+    def __init__(self, max_entries=128, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Persistent tier backed by a single SQLite file; survives process restarts.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by all threads; access is serialized with the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at < time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._conn.commit()
+
+    def prune(self):
+        """
+        Delete all expired rows. Returns the number of rows removed.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+
+class TieredCache:
+    """
+    Look up keys in each tier in order (fastest first) and keep hit/miss counters.
+
+    A hit in a slower tier is promoted into all faster tiers. Any object with
+    get(key) and set(key, value) methods can be used as a tier.
+    """
+
+    def __init__(self, tiers):
+        self.tiers = list(tiers)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sets": 0}
+        self._tier_hits = [0] * len(self.tiers)
+
+    def get(self, key):
+        for index, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster_tier in self.tiers[:index]:
+                    faster_tier.set(key, value)
+                with self._lock:
+                    self._stats["hits"] += 1
+                    self._tier_hits[index] += 1
+                return value
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key, value):
+        for tier in self.tiers:
+            tier.set(key, value)
+        with self._lock:
+            self._stats["sets"] += 1
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self):
+        """
+        Return a snapshot of hit/miss counters, including hits per tier.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tier_hits"] = {
+                type(tier).__name__: hits for tier, hits in zip(self.tiers, self._tier_hits)
+            }
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def build_cache(name, max_entries=128, ttl_seconds=3600, disk_ttl_seconds=7 * 24 * 3600, persistent=True):
+    """
+    Build a TieredCache using environment overrides.
+
+    - <NAME>_CACHE_SIZE: max entries in the memory tier
+    - <NAME>_CACHE_TTL: memory tier TTL in seconds
+    - <NAME>_CACHE_PATH: SQLite file for the disk tier ("" disables it)
+
+    With persistent=False the disk tier is off unless <NAME>_CACHE_PATH is set.
+    """
+    prefix = name.upper()
+    max_entries = int(os.getenv(f"{prefix}_CACHE_SIZE", max_entries))
+    ttl_seconds = float(os.getenv(f"{prefix}_CACHE_TTL", ttl_seconds))
+    default_path = os.path.join(DEFAULT_CACHE_DIR, f"{name.lower()}.sqlite3") if persistent else ""
+    path = os.getenv(f"{prefix}_CACHE_PATH", default_path)
+
+    tiers = [LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)]
+    if path:
+        tiers.append(SQLiteCache(path, ttl_seconds=disk_ttl_seconds))
+    return TieredCache(tiers)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class _StreamFlight:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.readers = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving while
+    it is in flight wait for its result instead of repeating the work, and receive the
+    same exception if it fails. Followers give up after timeout_seconds with a
+    TimeoutError. Nothing is remembered once the call finishes; combine with a cache
+    for that.
+
+    stream() does the same for iterators: followers replay the chunks produced so far
+    and then receive new chunks as the leader's stream produces them.
+
+    Outcomes are counted in stats() and in the tracing counter "singleflight"
+    (labels: group, outcome = executed, coalesced, timeout, error).
+    """
+
+    def __init__(self, name, timeout_seconds=None):
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+        self._flights = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._stats = {"executed": 0, "coalesced": 0, "timeout": 0, "error": 0}
+
+    def _count(self, outcome):
+        with self._lock:
+            self._stats[outcome] += 1
+        increment("singleflight", group=self.name, outcome=outcome)
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Return func(*args, **kwargs), sharing the result with concurrent calls for key.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+
+        if not leader:
+            if not flight.done.wait(self.timeout_seconds):
+                self._count("timeout")
+                raise TimeoutError(f"Timed out after {self.timeout_seconds}s waiting for an identical "
+                                   f"{self.name} request already in progress")
+            self._count("coalesced")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            self._count("error")
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        self._count("executed")
+        return flight.result
+
+    def stream(self, key, func, *args, **kwargs):
+        """
+        Yield the chunks of the iterator func(*args, **kwargs), sharing them with concurrent calls for key.
+
+        The iterator is driven by a background thread, so a reader that stops early never
+        blocks on the rest of the stream. The stream is cancelled once nobody reads it.
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._streams[key] = _StreamFlight()
+            flight.readers += 1
+
+        if leader:
+            threading.Thread(target=self._pump_stream, args=(key, flight, func, args, kwargs),
+                             name=f"{self.name}-stream", daemon=True).start()
+        try:
+            yield from self._read_stream(flight, None if leader else self.timeout_seconds)
+        finally:
+            with self._lock:
+                flight.readers -= 1
+        if not leader:
+            self._count("coalesced")
+
+    def _pump_stream(self, key, flight, func, args, kwargs):
+        iterator = None
+        cancelled = False
+        try:
+            iterator = iter(func(*args, **kwargs))
+            for chunk in iterator:
+                with self._lock:
+                    cancelled = flight.readers == 0
+                    if cancelled:
+                        # Later callers for key start a new stream instead of joining this one
+                        del self._streams[key]
+                if cancelled:
+                    raise RuntimeError(f"The {self.name} stream was cancelled because nobody was reading it")
+                with flight.condition:
+                    flight.chunks.append(chunk)
+                    flight.condition.notify_all()
+        except BaseException as e:
+            flight.error = e
+            if not cancelled:
+                self._count("error")
+        else:
+            self._count("executed")
+        finally:
+            if cancelled and hasattr(iterator, "close"):
+                iterator.close()
+            with self._lock:
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+            with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    def _read_stream(self, flight, timeout_seconds):
+        position = 0
+        while True:
+            with flight.condition:
+                if not flight.condition.wait_for(lambda: flight.done or len(flight.chunks) > position,
+                                                 timeout_seconds):
+                    self._count("timeout")
+                    raise TimeoutError(f"Timed out after {timeout_seconds}s waiting for an identical "
+                                       f"{self.name} stream already in progress")
+                chunks = flight.chunks[position:]
+                done = flight.done
+            position += len(chunks)
+            yield from chunks
+            if done:
+                break
+        if flight.error is not None:
+            raise flight.error
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights) + len(self._streams)
+
+    def stats(self):
+        """
+        Returns:
+        - Counts of executed calls, coalesced calls (work saved), follower timeouts and leader errors
+        """
+        with self._lock:
+            return dict(self._stats)
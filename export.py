@@ -0,0 +1,615 @@
+# export.py
+# This module renders the optimized resume and cover letter into DOCX and PDF
+# documents in memory, and bundles batches of them into a single zip archive.
+#
+# Templates are style specifications (TEMPLATES) compiled once per process by
+# get_template: the DOCX base document with its styles applied is serialized
+# once and every export starts from a copy of those bytes, and the PDF text
+# styles and page geometry are resolved up front. Nothing is written to disk.
+#
+# PDFs are written directly (standard Helvetica fonts, WinAnsi encoding,
+# compressed content streams), so no PDF authoring library is needed. Text
+# outside WinAnsi is transliterated where possible; anything else (e.g. CJK or
+# Cyrillic) is reported by unsupported_pdf_characters, and DOCX keeps it intact.
+#
+# Usage (bulk export of batch.py results):
+#   python export.py batch_results.jsonl --output tailored.zip --formats docx pdf
+
+import argparse
+import functools
+import io
+import json
+import os
+import re
+import sys
+import unicodedata
+import zipfile
+import zlib
+
+from tracing import span
+from utils import classify_section_header, parse_optimization_output, strip_bullet
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PDF_MIME = "application/pdf"
+ZIP_MIME = "application/zip"
+
+# Document styles; sizes are in points, colors are RGB
+TEMPLATES = {
+    "classic": {
+        "font": "Calibri",
+        "body_size": 10.5,
+        "name_size": 20,
+        "heading_size": 12,
+        "contact_size": 9.5,
+        "line_spacing": 1.2,
+        "accent": (0x1F, 0x3A, 0x5F),
+        "margin_inches": 0.75,
+    },
+    "compact": {
+        "font": "Arial",
+        "body_size": 9.5,
+        "name_size": 16,
+        "heading_size": 10.5,
+        "contact_size": 8.5,
+        "line_spacing": 1.1,
+        "accent": (0x33, 0x33, 0x33),
+        "margin_inches": 0.5,
+    },
+}
+
+DEFAULT_TEMPLATE = os.getenv("EXPORT_TEMPLATE", "classic")
+if DEFAULT_TEMPLATE not in TEMPLATES:
+    print(f"Unknown EXPORT_TEMPLATE '{DEFAULT_TEMPLATE}', using 'classic'. Available: {', '.join(sorted(TEMPLATES))}")
+    DEFAULT_TEMPLATE = "classic"
+
+# Documents that can be exported, mapped to the ParsedOutput attribute holding their text
+EXPORT_DOCUMENTS = {"resume": "processed_resume", "cover_letter": "cover_letter"}
+
+# US Letter, in points
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+
+_INLINE_MARKUP_RE = re.compile(r"^#+\s*|\*\*|__")
+
+def _clean_line(line):
+    return _INLINE_MARKUP_RE.sub("", line.replace("\t", "    ")).rstrip()
+
+def _is_heading(line):
+    stripped = line.strip().rstrip(":")
+    if not stripped or len(stripped) > 60:
+        return False
+    if stripped.isupper():
+        return True
+    return classify_section_header(stripped) is not None and len(stripped.split()) <= 3
+
+def iter_blocks(text, document="resume"):
+    """
+    Classify each line of a resume or cover letter for layout.
+
+    For a resume the first line is the name and the lines after it, up to the first
+    blank line or heading, are contact details.
+
+    Returns:
+    - A generator of (kind, text) tuples, where kind is "name", "contact", "heading",
+      "bullet", "paragraph" or "blank"
+    """
+    in_header = document == "resume"
+    seen_name = False
+    for raw_line in (text or "").strip().split("\n"):
+        line = _clean_line(raw_line)
+        if not line.strip():
+            in_header = in_header and not seen_name
+            yield "blank", ""
+        elif in_header and not seen_name:
+            seen_name = True
+            yield "name", line.strip()
+        elif document == "resume" and _is_heading(line):
+            in_header = False
+            yield "heading", line.strip().rstrip(":")
+        elif in_header:
+            yield "contact", line.strip()
+        else:
+            bullet_text = strip_bullet(line)
+            if bullet_text is not None and bullet_text.strip():
+                yield "bullet", bullet_text.strip()
+            else:
+                yield "paragraph", line.strip()
+
+
+class CompiledTemplate:
+    """
+    A template resolved for rendering: the DOCX base document bytes and the PDF text styles.
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.spec = spec
+        self.docx_bytes, self.docx_style_ids = _build_docx_base(spec)
+
+        self.margin = spec["margin_inches"] * 72
+        self.text_width = PAGE_WIDTH - 2 * self.margin
+        accent = " ".join(f"{channel / 255:.3f}" for channel in spec["accent"])
+        spacing = spec["line_spacing"]
+        # kind -> (font, size, leading, space before, fill color operator)
+        self.pdf_styles = {
+            "name": ("F2", spec["name_size"], spec["name_size"] * 1.2, 0, f"{accent} rg"),
+            "contact": ("F1", spec["contact_size"], spec["contact_size"] * spacing, 0, "0.25 g"),
+            "heading": ("F2", spec["heading_size"], spec["heading_size"] * spacing,
+                        spec["heading_size"] * 0.9, f"{accent} rg"),
+            "bullet": ("F1", spec["body_size"], spec["body_size"] * spacing, 1, "0 g"),
+            "paragraph": ("F1", spec["body_size"], spec["body_size"] * spacing, 1, "0 g"),
+        }
+        self.pdf_rule_color = f"{accent} RG"
+        self.pdf_blank_height = spec["body_size"] * 0.6
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_template(name):
+    return CompiledTemplate(name, TEMPLATES[name])
+
+def get_template(name=None):
+    """
+    Return the compiled template (compiled on first use, then shared by the whole process).
+    """
+    name = name or DEFAULT_TEMPLATE
+    if name not in TEMPLATES:
+        raise ValueError(f"Unknown export template '{name}'. Available: {', '.join(sorted(TEMPLATES))}")
+    return _compile_template(name)
+
+
+# --- DOCX ---
+
+def _set_style_font(style, spec, size, bold=False, color=None):
+    from docx.oxml.ns import qn
+    from docx.shared import Pt, RGBColor
+
+    style.font.name = spec["font"]
+    style.font.size = Pt(size)
+    style.font.bold = bold
+    if color is not None:
+        style.font.color.rgb = RGBColor(*color)
+    # Theme fonts in the default template take precedence over the explicit name
+    fonts = style.element.rPr.rFonts
+    for attribute in ("w:asciiTheme", "w:hAnsiTheme", "w:eastAsiaTheme", "w:cstheme"):
+        fonts.attrib.pop(qn(attribute), None)
+
+# Paragraph style per block kind; paragraphs use Normal
+_DOCX_STYLES = {"name": "Title", "contact": "Contact", "heading": "Heading 1", "bullet": "List Bullet"}
+
+def _build_docx_base(spec):
+    from docx import Document
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Inches, Pt
+
+    document = Document()
+    for section in document.sections:
+        section.page_width = Inches(PAGE_WIDTH / 72)
+        section.page_height = Inches(PAGE_HEIGHT / 72)
+        section.left_margin = section.right_margin = Inches(spec["margin_inches"])
+        section.top_margin = section.bottom_margin = Inches(spec["margin_inches"])
+
+    styles = document.styles
+    normal = styles["Normal"]
+    _set_style_font(normal, spec, spec["body_size"])
+    normal.paragraph_format.space_after = Pt(2)
+    normal.paragraph_format.line_spacing = spec["line_spacing"]
+
+    title = styles["Title"]
+    _set_style_font(title, spec, spec["name_size"], bold=True, color=spec["accent"])
+    title.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    title.paragraph_format.space_after = Pt(2)
+
+    contact = styles.add_style("Contact", WD_STYLE_TYPE.PARAGRAPH)
+    contact.base_style = normal
+    contact.font.size = Pt(spec["contact_size"])
+    contact.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    heading = styles["Heading 1"]
+    _set_style_font(heading, spec, spec["heading_size"], bold=True, color=spec["accent"])
+    heading.paragraph_format.space_before = Pt(spec["heading_size"] * 0.9)
+    heading.paragraph_format.space_after = Pt(2)
+
+    _set_style_font(styles["List Bullet"], spec, spec["body_size"])
+
+    # Looking a style up by name scans every style in the document, so the ids are resolved here once
+    style_ids = {kind: styles[style_name].style_id for kind, style_name in _DOCX_STYLES.items()}
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue(), style_ids
+
+def render_docx(text, document="resume", template=None):
+    """
+    Render a resume or cover letter as a DOCX file.
+
+    Returns:
+    - The DOCX file contents as bytes
+    """
+    from docx import Document
+
+    compiled = get_template(template)
+    docx_document = Document(io.BytesIO(compiled.docx_bytes))
+    for kind, line in iter_blocks(text, document):
+        if kind == "blank":
+            # Resume styles already space sections; letters keep the blank line between paragraphs
+            if document == "cover_letter":
+                docx_document.add_paragraph()
+            continue
+        paragraph = docx_document.add_paragraph(line)
+        style_id = compiled.docx_style_ids.get(kind)
+        if style_id:
+            paragraph._p.get_or_add_pPr().style = style_id
+    buffer = io.BytesIO()
+    docx_document.save(buffer)
+    return buffer.getvalue()
+
+
+# --- PDF ---
+
+# Advance widths (1/1000 em) of the printable ASCII characters, from the standard Type 1 font metrics
+_HELVETICA_ASCII_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD_ASCII_WIDTHS = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+
+def _width_table(ascii_widths, quotes):
+    # Everything outside ASCII defaults to the width of a digit
+    widths = [556] * 256
+    widths[32:127] = ascii_widths
+    widths[0x91:0x95] = quotes
+    widths[0x95] = 350   # bullet
+    widths[0x97] = 1000  # em dash
+    return widths
+
+_FONT_WIDTHS = {
+    "F1": _width_table(_HELVETICA_ASCII_WIDTHS, [222, 222, 333, 333]),
+    "F2": _width_table(_HELVETICA_BOLD_ASCII_WIDTHS, [278, 278, 500, 500]),
+}
+_PDF_FONTS = {"F1": "Helvetica", "F2": "Helvetica-Bold"}
+_BULLET = "•".encode("cp1252")
+_BULLET_INDENT = 12
+
+# Common characters outside WinAnsi that have a close equivalent in it
+_PDF_SUBSTITUTIONS = str.maketrans({
+    "\u2010": "-", "\u2011": "-", "\u2012": "-", "\u2043": "-", "\u2212": "-",
+    "\u2015": "\u2014", "\u2192": "->", "\u2190": "<-", "\u2264": "<=", "\u2265": ">=",
+    "\u25cf": "\u2022", "\u25aa": "\u2022", "\u25e6": "\u2022", "\u2023": "\u2022",
+    "\u2009": " ", "\u202f": " ", "\u2007": " ", "\u200b": "", "\ufeff": "",
+    "\ufb01": "fi", "\ufb02": "fl", "\u0141": "L", "\u0142": "l", "\u0110": "D", "\u0111": "d",
+})
+
+def _to_winansi(text):
+    """
+    Map text onto the WinAnsi character set of the standard PDF fonts.
+
+    Returns:
+    - (data, unsupported) where unsupported is the set of characters replaced with "?"
+    """
+    text = text.translate(_PDF_SUBSTITUTIONS)
+    try:
+        return text.encode("cp1252"), set()
+    except UnicodeEncodeError:
+        pass
+    data = bytearray()
+    unsupported = set()
+    for character in text:
+        try:
+            data += character.encode("cp1252")
+            continue
+        except UnicodeEncodeError:
+            pass
+        # Accented letters WinAnsi lacks (e.g. "ő", "ł") fall back to the base letter
+        base = "".join(c for c in unicodedata.normalize("NFKD", character) if not unicodedata.combining(c))
+        try:
+            data += base.encode("cp1252") if base else b"?"
+        except UnicodeEncodeError:
+            data += b"?"
+            base = ""
+        if not base:
+            unsupported.add(character)
+    return bytes(data), unsupported
+
+def unsupported_pdf_characters(text):
+    """
+    Characters of text that the PDF export cannot show (they are printed as "?").
+    The DOCX export keeps them.
+
+    Returns:
+    - A sorted list of characters, empty when the PDF shows all of text
+    """
+    return sorted(_to_winansi(text)[1])
+
+def _encode_pdf_text(text):
+    return _to_winansi(text)[0]
+
+def _pdf_string(data):
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+def _text_width(data, font):
+    widths = _FONT_WIDTHS[font]
+    return sum(widths[byte] for byte in data)
+
+def _wrap(data, font, size, width):
+    """
+    Greedily break encoded text into lines no wider than width points.
+    """
+    widths = _FONT_WIDTHS[font]
+    limit = width * 1000 / size
+    space = widths[32]
+    lines = []
+    current, current_width = b"", 0
+    for word in data.split(b" "):
+        word_width = _text_width(word, font)
+        if current and current_width + space + word_width > limit:
+            lines.append(current)
+            current, current_width = b"", 0
+        # A word longer than a whole line is broken between characters
+        while word_width > limit:
+            cut, cut_width = 0, 0
+            while cut < len(word) and cut_width + widths[word[cut]] <= limit:
+                cut_width += widths[word[cut]]
+                cut += 1
+            cut = max(cut, 1)
+            lines.append(word[:cut])
+            word = word[cut:]
+            word_width = _text_width(word, font)
+        if current:
+            current += b" " + word
+            current_width += space + word_width
+        else:
+            current, current_width = word, word_width
+    lines.append(current)
+    return lines
+
+
+class _PdfLayout:
+    """
+    Lays out blocks top to bottom, starting a new page whenever the current one is full.
+    """
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.pages = []
+        self.operations = None
+        self.y = 0
+
+    def _new_page(self):
+        self.operations = []
+        self.pages.append(self.operations)
+        self.y = PAGE_HEIGHT - self.compiled.margin
+
+    def _reserve(self, height):
+        if self.operations is None or self.y - height < self.compiled.margin:
+            self._new_page()
+            return True
+        return False
+
+    def _text(self, data, font, size, x, color):
+        self.operations.append(b"%s BT /%s %.2f Tf 1 0 0 1 %.2f %.2f Tm %s Tj ET"
+                               % (color.encode("ascii"), font.encode("ascii"), size, x, self.y,
+                                  _pdf_string(data)))
+
+    def add(self, kind, text):
+        compiled = self.compiled
+        if kind == "blank":
+            if self.operations is not None:
+                self.y -= compiled.pdf_blank_height
+            return
+        font, size, leading, space_before, color = compiled.pdf_styles[kind]
+        indent = _BULLET_INDENT if kind == "bullet" else 0
+        lines = _wrap(_encode_pdf_text(text), font, size, compiled.text_width - indent)
+        for index, line in enumerate(lines):
+            # Space before a block is dropped at the top of a page
+            gap = space_before if index == 0 else 0
+            if self._reserve(gap + leading):
+                gap = 0
+            self.y -= gap + leading
+            x = compiled.margin + indent
+            if kind in ("name", "contact"):
+                x = compiled.margin + (compiled.text_width - _text_width(line, font) * size / 1000) / 2
+            if kind == "bullet" and index == 0:
+                self._text(_BULLET, font, size, compiled.margin + 2, color)
+            self._text(line, font, size, x, color)
+        if kind == "heading":
+            rule_y = self.y - 3
+            self.operations.append(b"%s 0.6 w %.2f %.2f m %.2f %.2f l S"
+                                   % (compiled.pdf_rule_color.encode("ascii"), compiled.margin, rule_y,
+                                      PAGE_WIDTH - compiled.margin, rule_y))
+            self.y -= 3
+
+
+def _write_pdf(pages):
+    # Objects: 1 catalog, 2 page tree, 3-4 fonts, then a content stream and a page per page
+    first_page_object = 3 + len(_PDF_FONTS)
+    page_numbers = [first_page_object + 2 * index + 1 for index in range(len(pages))]
+    font_resources = " ".join(f"/{key} {3 + index} 0 R" for index, key in enumerate(_PDF_FONTS))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>"
+         % (" ".join(f"{number} 0 R" for number in page_numbers), len(pages))).encode("ascii"),
+    ]
+    objects.extend(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding >>"
+                   .encode("ascii") for base_font in _PDF_FONTS.values())
+    for index, operations in enumerate(pages):
+        content = zlib.compress(b"\n".join(operations))
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content
+                       + b"\nendstream")
+        objects.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << %s >> >> "
+                        "/Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, font_resources,
+                                                 page_numbers[index] - 1)).encode("ascii"))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def render_pdf(text, document="resume", template=None):
+    """
+    Render a resume or cover letter as a PDF file.
+
+    Returns:
+    - The PDF file contents as bytes
+    """
+    layout = _PdfLayout(get_template(template))
+    for kind, line in iter_blocks(text, document):
+        layout.add(kind, line)
+    if not layout.pages:
+        layout._new_page()
+    return _write_pdf(layout.pages)
+
+
+# --- Export entry points ---
+
+FORMATS = {"docx": (render_docx, DOCX_MIME), "pdf": (render_pdf, PDF_MIME)}
+
+def export_document(parsed, document="resume", file_format="docx", template=None):
+    """
+    Render one document of a parsed model response (see utils.ParsedOutput).
+
+    Returns:
+    - The file contents as bytes, ready to pass to st.download_button
+    """
+    renderer, _ = FORMATS[file_format]
+    text = getattr(parsed, EXPORT_DOCUMENTS[document])
+    with span("export", document=document, format=file_format, input_chars=len(text)) as s:
+        if file_format == "pdf":
+            s.set(unsupported_chars=len(unsupported_pdf_characters(text)))
+        data = renderer(text, document, template)
+        s.set(output_bytes=len(data))
+    return data
+
+def iter_export_files(parsed, prefix="", formats=tuple(FORMATS), template=None):
+    """
+    Render every exportable document of a parsed response, one file at a time.
+
+    Returns:
+    - A generator of (file_name, data) tuples
+    """
+    for document in EXPORT_DOCUMENTS:
+        for file_format in formats:
+            yield f"{prefix}optimized_{document}.{file_format}", export_document(parsed, document, file_format,
+                                                                                template)
+
+def _safe_file_name(name):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(name)).strip("._") or "job"
+
+def iter_batch_files(records, formats=tuple(FORMATS), template=None):
+    """
+    Render the documents of each successful batch.py result into its own folder.
+
+    Returns:
+    - A generator of (file_name, data) tuples
+    """
+    for record in records:
+        if record.get("status") != "ok":
+            continue
+        parsed = parse_optimization_output(record.get("output", ""))
+        if not parsed.has_section("RESUME"):
+            print(f"Skipping {record.get('id')}: no RESUME: section in the output")
+            continue
+        if "pdf" in formats:
+            unsupported = unsupported_pdf_characters(parsed.processed_resume + parsed.cover_letter)
+            if unsupported:
+                print(f"{record.get('id')}: the PDFs show {''.join(unsupported[:10])} as '?'; "
+                      f"use the DOCX files to keep these characters")
+        yield from iter_export_files(parsed, f"{_safe_file_name(record.get('id'))}/", formats, template)
+
+
+class _ChunkWriter:
+    """
+    Write-only, unseekable file object that collects what zipfile writes until it is drained.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return b"".join(chunks)
+
+def iter_zip(files):
+    """
+    Build a zip archive from (file_name, data) tuples in a single streaming pass.
+
+    Each file is compressed and yielded as soon as it arrives, so pairing this with a
+    lazy generator (iter_export_files, iter_batch_files) renders, compresses and emits
+    one document at a time and never holds the whole batch in memory.
+
+    Returns:
+    - A generator of zip archive byte chunks
+    """
+    writer = _ChunkWriter()
+    # An unseekable output makes zipfile write each entry's sizes after its data
+    with zipfile.ZipFile(writer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for file_name, data in files:
+            # DOCX and PDF contents are already compressed
+            compress_type = zipfile.ZIP_STORED if file_name.endswith((".docx", ".pdf")) else zipfile.ZIP_DEFLATED
+            archive.writestr(file_name, data, compress_type=compress_type)
+            yield writer.drain()
+    yield writer.drain()
+
+def build_zip(files):
+    """
+    Returns:
+    - The complete zip archive of (file_name, data) tuples as bytes (see iter_zip)
+    """
+    return b"".join(iter_zip(files))
+
+def export_zip(parsed, formats=tuple(FORMATS), template=None):
+    """
+    Returns:
+    - A zip archive (bytes) of every exportable document of a parsed response
+    """
+    return build_zip(iter_export_files(parsed, formats=formats, template=template))
+
+
+def _iter_records(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export batch.py results as DOCX/PDF documents in one zip.")
+    parser.add_argument("results", help="Batch results JSONL file written by batch.py")
+    parser.add_argument("--output", default="tailored_documents.zip", help="Zip file to write")
+    parser.add_argument("--formats", nargs="+", choices=sorted(FORMATS), default=sorted(FORMATS))
+    parser.add_argument("--template", choices=sorted(TEMPLATES), default=DEFAULT_TEMPLATE)
+    args = parser.parse_args(argv)
+
+    files = iter_batch_files(_iter_records(args.results), args.formats, args.template)
+    with open(args.output, "wb") as out:
+        for chunk in iter_zip(files):
+            out.write(chunk)
+    print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+# history.py
+# This module contains a persistent local history of optimization runs: the
+# inputs, output, ATS scores and timing of every run, stored in SQLite and
+# searchable by company, keyword or date, so past results can be reopened
+# without another LLM call.
+#
+# Texts are zlib-compressed and stored once per distinct content (the same base
+# resume and cover letter are reused across many runs). Keyword search uses a
+# contentless FTS5 index, so the indexed text is not stored a second time.
+#
+# History is off by default: the store is a single shared scope, so every app
+# session and API client can read all recorded runs. Only enable it for a
+# single-user (local) deployment.
+#
+# Configuration:
+#   HISTORY_PATH=.cache/history.sqlite3   location of the store (unset or "" disables history)
+
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from ats_scorer import score_resume
+from cache import make_cache_key
+from utils import parse_optimization_output
+
+# Runs per page of search results
+HISTORY_PAGE_SIZE = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    company TEXT NOT NULL COLLATE NOCASE,
+    job_title TEXT NOT NULL,
+    input_key TEXT NOT NULL,
+    base_resume_key TEXT NOT NULL,
+    base_cover_letter_key TEXT NOT NULL,
+    job_description_key TEXT NOT NULL,
+    output_key TEXT NOT NULL,
+    ats_score REAL,
+    baseline_ats_score REAL,
+    duration_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_company ON runs (company, created_at);
+CREATE INDEX IF NOT EXISTS runs_input_key ON runs (input_key, created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5 (
+    company, job_title, job_description, output, content=''
+);
+"""
+
+# Columns returned for each run in search results (no texts, so nothing is decompressed)
+_SUMMARY_COLUMNS = ("id", "created_at", "source", "company", "job_title", "ats_score", "baseline_ats_score",
+                    "duration_seconds")
+
+_COMPANY_LINE_RE = re.compile(r"^\s*(?:company|company name|employer|organization)\s*[:\-]\s*(.+?)\s*$",
+                              re.IGNORECASE | re.MULTILINE)
+_TITLE_LINE_RE = re.compile(r"^\s*(?:job title|title|position|role)\s*[:\-]\s*(.+?)\s*$",
+                            re.IGNORECASE | re.MULTILINE)
+_TITLE_AT_COMPANY_RE = re.compile(r"^(.{2,80}?)\s+(?:at|@)\s+(.{2,60}?)\.?$")
+_ABOUT_COMPANY_RE = re.compile(r"^about\s+(.{2,60}?)\s*:?$", re.IGNORECASE)
+_GENERIC_ABOUT = {"us", "you", "the role", "the job", "the team", "the company", "the position", "this role"}
+
+def guess_job_details(job_description):
+    """
+    Guess the job title and company from the labeled fields or first lines of a job description.
+
+    Returns:
+    - A (job_title, company) tuple; either may be ""
+    """
+    lines = [line.strip() for line in (job_description or "").split("\n") if line.strip()][:10]
+    title_match = _TITLE_LINE_RE.search(job_description or "")
+    company_match = _COMPANY_LINE_RE.search(job_description or "")
+    job_title = title_match.group(1) if title_match else ""
+    company = company_match.group(1) if company_match else ""
+
+    for line in lines[:3]:
+        match = _TITLE_AT_COMPANY_RE.match(line)
+        if match:
+            job_title = job_title or match.group(1)
+            company = company or match.group(2)
+            break
+    if not company:
+        for line in lines:
+            match = _ABOUT_COMPANY_RE.match(line)
+            if match and match.group(1).lower() not in _GENERIC_ABOUT:
+                company = match.group(1)
+                break
+    if not job_title and lines and len(lines[0]) <= 80:
+        job_title = lines[0]
+    return job_title[:120], company[:120]
+
+
+def _text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _fts_query(keywords):
+    # Each word must match (as a prefix); quoting keeps FTS5 operators in user input literal
+    words = re.findall(r"\w+", keywords.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class HistoryStore:
+    """
+    SQLite store of past runs with paginated search (see search).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by all threads; access is serialized with the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def _put_text(self, text):
+        key = _text_key(text)
+        self._conn.execute("INSERT OR IGNORE INTO texts (key, data) VALUES (?, ?)",
+                           (key, zlib.compress(text.encode("utf-8"), 9)))
+        return key
+
+    def _get_text(self, key):
+        row = self._conn.execute("SELECT data FROM texts WHERE key = ?", (key,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else ""
+
+    def record(self, user_input, output, duration_seconds=None, source="app", company=None, job_title=None):
+        """
+        Store a finished run; user_input holds base_resume, base_cover_letter and job_description.
+
+        A run identical to the latest one for the same inputs (e.g. a cached response)
+        is not stored again.
+
+        Returns:
+        - The run ID
+        """
+        job_description = user_input["job_description"]
+        guessed_title, guessed_company = guess_job_details(job_description)
+        company = company or guessed_company
+        job_title = job_title or guessed_title
+        parsed = parse_optimization_output(output)
+        ats_score = score_resume(parsed.processed_resume, job_description)["score"] if parsed.resume else None
+        baseline_ats_score = score_resume(user_input["base_resume"], job_description)["score"]
+        input_key = make_cache_key(user_input["base_resume"], user_input["base_cover_letter"], job_description)
+
+        with self._lock, self._conn:
+            latest = self._conn.execute(
+                "SELECT id, output_key FROM runs WHERE input_key = ? ORDER BY created_at DESC LIMIT 1", (input_key,)
+            ).fetchone()
+            if latest is not None and latest[1] == _text_key(output):
+                return latest[0]
+            cursor = self._conn.execute(
+                "INSERT INTO runs (created_at, source, company, job_title, input_key, base_resume_key,"
+                " base_cover_letter_key, job_description_key, output_key, ats_score, baseline_ats_score,"
+                " duration_seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), source, company, job_title, input_key,
+                 self._put_text(user_input["base_resume"]), self._put_text(user_input["base_cover_letter"]),
+                 self._put_text(job_description), self._put_text(output),
+                 ats_score, baseline_ats_score, duration_seconds),
+            )
+            self._conn.execute(
+                "INSERT INTO runs_fts (rowid, company, job_title, job_description, output) VALUES (?, ?, ?, ?, ?)",
+                (cursor.lastrowid, company, job_title, job_description, output),
+            )
+            return cursor.lastrowid
+
+    def get(self, run_id):
+        """
+        Returns:
+        - The run's summary fields plus "user_input" and "output", or None if it does not exist
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_SUMMARY_COLUMNS)}, base_resume_key, base_cover_letter_key,"
+                " job_description_key, output_key FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            run = dict(zip(_SUMMARY_COLUMNS, row))
+            base_resume, base_cover_letter, job_description, output = (
+                self._get_text(key) for key in row[len(_SUMMARY_COLUMNS):]
+            )
+        run["user_input"] = {
+            "base_resume": base_resume,
+            "base_cover_letter": base_cover_letter,
+            "job_description": job_description,
+        }
+        run["output"] = output
+        return run
+
+    def find(self, base_resume, base_cover_letter, job_description):
+        """
+        Returns:
+        - The summary of the latest run with exactly these inputs, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM runs WHERE input_key = ?"
+                " ORDER BY created_at DESC LIMIT 1",
+                (make_cache_key(base_resume, base_cover_letter, job_description),),
+            ).fetchone()
+        return dict(zip(_SUMMARY_COLUMNS, row)) if row else None
+
+    def search(self, keywords="", company="", since=None, until=None, page=1, page_size=HISTORY_PAGE_SIZE):
+        """
+        Search runs, newest first.
+
+        - keywords: words that must all appear (as prefixes) in the company, job title,
+          job description or output
+        - company: company name prefix (case-insensitive)
+        - since, until: Unix timestamps bounding the run time (until is exclusive)
+
+        Returns:
+        - A dictionary with the page's "runs" (summaries), "total", "page" and "pages"
+        """
+        joins, conditions, params = "", [], []
+        query = _fts_query(keywords or "")
+        if query:
+            joins = " JOIN runs_fts ON runs_fts.rowid = runs.id"
+            conditions.append("runs_fts MATCH ?")
+            params.append(query)
+        if company and company.strip():
+            conditions.append("runs.company LIKE ? ESCAPE '\\'")
+            params.append(_escape_like(company.strip()) + "%")
+        if since is not None:
+            conditions.append("runs.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("runs.created_at < ?")
+            params.append(until)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+
+        page = max(1, int(page))
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM runs{joins}{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join('runs.' + column for column in _SUMMARY_COLUMNS)} FROM runs{joins}{where}"
+                " ORDER BY runs.created_at DESC, runs.id DESC LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size],
+            ).fetchall()
+        return {
+            "runs": [dict(zip(_SUMMARY_COLUMNS, row)) for row in rows],
+            "total": total,
+            "page": page,
+            "pages": max(1, math.ceil(total / page_size)),
+        }
+
+    def delete(self, run_id):
+        """
+        Delete a run, and any text no other run refers to. Returns True if the run existed.
+        """
+        run = self.get(run_id)
+        if run is None:
+            return False
+        with self._lock, self._conn:
+            keys = self._conn.execute(
+                "SELECT base_resume_key, base_cover_letter_key, job_description_key, output_key FROM runs WHERE id = ?",
+                (run_id,),
+            ).fetchone()
+            # A contentless index is updated by repeating the indexed values with the 'delete' command
+            self._conn.execute(
+                "INSERT INTO runs_fts (runs_fts, rowid, company, job_title, job_description, output)"
+                " VALUES ('delete', ?, ?, ?, ?, ?)",
+                (run_id, run["company"], run["job_title"], run["user_input"]["job_description"], run["output"]),
+            )
+            self._conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+            for key in set(keys):
+                self._conn.execute(
+                    "DELETE FROM texts WHERE key = ? AND NOT EXISTS (SELECT 1 FROM runs WHERE base_resume_key = ?"
+                    " OR base_cover_letter_key = ? OR job_description_key = ? OR output_key = ?)",
+                    (key, key, key, key, key),
+                )
+        return True
+
+    def stats(self):
+        """
+        Returns:
+        - A dictionary with the number of runs, the number of distinct texts and their compressed size in bytes
+        """
+        with self._lock:
+            runs = self._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            texts, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM texts"
+            ).fetchone()
+        return {"runs": runs, "texts": texts, "stored_bytes": stored_bytes}
+
+
+_history_store = None
+_history_store_lock = threading.Lock()
+
+def get_history_store():
+    """
+    Return the process-wide history store, or None unless HISTORY_PATH is set.
+    """
+    global _history_store
+    path = os.getenv("HISTORY_PATH", "")
+    if not path:
+        return None
+    with _history_store_lock:
+        if _history_store is None:
+            _history_store = HistoryStore(path)
+        return _history_store
+
+def record_run(user_input, output, **details):
+    """
+    Record a finished run in the history store, if history is enabled (see HistoryStore.record).
+
+    Errors are logged rather than raised, so a history problem never fails the run itself.
+
+    Returns:
+    - The run ID, or None
+    """
+    try:
+        store = get_history_store()
+        return store.record(user_input, output, **details) if store is not None else None
+    except (sqlite3.Error, OSError) as e:
+        print(f"Could not record the run in history: {e}")
+        return None
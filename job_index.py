@@ -0,0 +1,306 @@
+# job_index.py
+# This module contains a local vector index for ranking stored job descriptions
+# against a resume before sending the best matches to optimize_resume.
+#
+# Documents are chunked by section, embedded with signed hashed n-gram features
+# (CPU only, no model download), stored in a memory-mapped float32 matrix and
+# queried with vectorized dot products. New postings are appended incrementally.
+#
+# Usage:
+#   python job_index.py add --index job_index/ jobs/            (directory or JSONL, see batch.py)
+#   python job_index.py query --index job_index/ --resume resume.pdf -k 10
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import threading
+import zlib
+
+import numpy as np
+
+from utils import split_into_sections
+
+# Number of hashed feature dimensions per vector
+DEFAULT_DIMENSIONS = 4096
+
+# Sections longer than this many words are split into overlapping windows
+MAX_CHUNK_WORDS = 200
+CHUNK_OVERLAP_WORDS = 40
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+
+def _features(text):
+    """
+    Word unigrams, word bigrams and character trigrams of each word.
+    """
+    words = _WORD_RE.findall(text.lower())
+    features = list(words)
+    features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"#{word}#"
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+def embed(text, dimensions=DEFAULT_DIMENSIONS):
+    """
+    Embed text as an L2-normalized, signed hashed n-gram vector with sublinear term frequency.
+    """
+    counts = {}
+    for feature in _features(text):
+        counts[feature] = counts.get(feature, 0) + 1
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature, count in counts.items():
+        hashed = zlib.crc32(feature.encode("utf-8"))
+        sign = 1.0 if hashed & 0x80000000 else -1.0
+        vector[hashed % dimensions] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def chunk_document(text):
+    """
+    Split a document into (section, text) chunks using the resume section detection
+    from utils, windowing long sections so each chunk stays focused.
+    """
+    chunks = []
+    for section, section_text in split_into_sections(text):
+        words = section_text.split()
+        if len(words) <= MAX_CHUNK_WORDS:
+            chunks.append((section, section_text))
+            continue
+        step = MAX_CHUNK_WORDS - CHUNK_OVERLAP_WORDS
+        for start in range(0, len(words), step):
+            chunks.append((section, " ".join(words[start:start + MAX_CHUNK_WORDS])))
+            if start + MAX_CHUNK_WORDS >= len(words):
+                break
+    return chunks or [("HEADER", text or "")]
+
+
+class JobIndex:
+    """
+    Append-only vector index persisted in a directory:
+
+    - vectors.f32: memory-mapped float32 matrix, one row per chunk (grown by doubling)
+    - documents.jsonl: one line per added or removed document
+    - index.json: dimensions and number of rows in use
+
+    Re-adding a document ID replaces it; the old rows are ignored until compact().
+    """
+
+    def __init__(self, path, dimensions=DEFAULT_DIMENSIONS):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._documents_path = os.path.join(path, "documents.jsonl")
+        self._state_path = os.path.join(path, "index.json")
+        self._lock = threading.Lock()
+
+        state = {"dimensions": dimensions, "rows": 0}
+        if os.path.exists(self._state_path):
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        self.dimensions = state["dimensions"]
+        self.rows = state["rows"]
+
+        # Live documents: doc_id -> {"start", "count", "metadata"}
+        self.documents = {}
+        if os.path.exists(self._documents_path):
+            with open(self._documents_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record.get("deleted"):
+                        self.documents.pop(record["id"], None)
+                    else:
+                        self.documents[record["id"]] = record
+
+        if not os.path.exists(self._vectors_path):
+            open(self._vectors_path, "wb").close()
+        self._vectors = None
+        self._open_vectors(max(self.rows, 256))
+        self._row_owner = None
+
+    def _capacity(self):
+        return os.path.getsize(self._vectors_path) // (4 * self.dimensions)
+
+    def _open_vectors(self, min_rows):
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        if self._capacity() < min_rows:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(min_rows * 4 * self.dimensions)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(self._capacity(), self.dimensions))
+
+    def _save_state(self):
+        self._vectors.flush()
+        temporary_path = self._state_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({"dimensions": self.dimensions, "rows": self.rows}, f)
+        os.replace(temporary_path, self._state_path)
+
+    def add(self, doc_id, text, metadata=None):
+        """
+        Chunk, embed and append a document. Returns the number of chunks stored.
+        """
+        return self._append(doc_id, text, metadata, save=True)
+
+    def add_many(self, documents):
+        """
+        Add an iterable of (doc_id, text) or (doc_id, text, metadata) tuples, saving once.
+        """
+        added = 0
+        for document in documents:
+            self._append(*document, save=False)
+            added += 1
+        with self._lock:
+            self._save_state()
+        return added
+
+    def _append(self, doc_id, text, metadata=None, save=True):
+        chunks = chunk_document(text)
+        matrix = np.stack([embed(chunk_text, self.dimensions) for _, chunk_text in chunks])
+        with self._lock:
+            if self.rows + len(chunks) > self._capacity():
+                self._open_vectors(max(2 * self._capacity(), self.rows + len(chunks)))
+            self._vectors[self.rows:self.rows + len(chunks)] = matrix
+            record = {
+                "id": str(doc_id),
+                "start": self.rows,
+                "count": len(chunks),
+                "sections": [section for section, _ in chunks],
+                "metadata": metadata or {},
+            }
+            with open(self._documents_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.documents[record["id"]] = record
+            self.rows += len(chunks)
+            self._row_owner = None
+            if save:
+                self._save_state()
+        return len(chunks)
+
+    def remove(self, doc_id):
+        with self._lock:
+            if self.documents.pop(str(doc_id), None) is None:
+                return False
+            with open(self._documents_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"id": str(doc_id), "deleted": True}) + "\n")
+            self._row_owner = None
+            return True
+
+    def _owners(self):
+        """
+        Map each live row to its document position (-1 for replaced/removed rows).
+        """
+        if self._row_owner is None:
+            owners = np.full(self.rows, -1, dtype=np.int64)
+            self._doc_ids = list(self.documents)
+            for position, doc_id in enumerate(self._doc_ids):
+                record = self.documents[doc_id]
+                owners[record["start"]:record["start"] + record["count"]] = position
+            self._row_owner = owners
+        return self._row_owner, self._doc_ids
+
+    def query(self, text, k=10):
+        """
+        Rank documents by their best-matching chunk's cosine similarity to text.
+
+        Returns:
+        - A list of dictionaries with "id", "score", "section" and "metadata", best first
+        """
+        if not self.documents:
+            return []
+        query_vector = embed(text, self.dimensions)
+        with self._lock:
+            owners, doc_ids = self._owners()
+            scores = np.asarray(self._vectors[:self.rows] @ query_vector)
+
+        live = owners >= 0
+        best = np.full(len(doc_ids), -np.inf, dtype=np.float32)
+        np.maximum.at(best, owners[live], scores[live])
+
+        k = min(k, len(doc_ids))
+        top = np.argpartition(-best, k - 1)[:k]
+        top = top[np.argsort(-best[top], kind="stable")]
+
+        results = []
+        for position in top:
+            record = self.documents[doc_ids[position]]
+            rows = scores[record["start"]:record["start"] + record["count"]]
+            results.append({
+                "id": record["id"],
+                "score": float(best[position]),
+                "section": record["sections"][int(np.argmax(rows))],
+                "metadata": record["metadata"],
+            })
+        return results
+
+    def compact(self):
+        """
+        Rewrite the index without rows from replaced or removed documents.
+        """
+        with self._lock:
+            live = list(self.documents.values())
+            matrix = np.concatenate(
+                [np.asarray(self._vectors[r["start"]:r["start"] + r["count"]]) for r in live]
+            ) if live else np.zeros((0, self.dimensions), dtype=np.float32)
+            start = 0
+            for record in live:
+                record["start"] = start
+                start += record["count"]
+            self._vectors[:len(matrix)] = matrix
+            self.rows = len(matrix)
+            with open(self._documents_path + ".tmp", "w", encoding="utf-8") as f:
+                for record in live:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(self._documents_path + ".tmp", self._documents_path)
+            self._row_owner = None
+            self._save_state()
+
+    def __len__(self):
+        return len(self.documents)
+
+
+def main(argv=None):
+    from batch import check_document_text, load_job_descriptions, read_document
+
+    parser = argparse.ArgumentParser(description="Rank stored job descriptions against a resume.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add_parser = subparsers.add_parser("add", help="Add job descriptions to the index")
+    add_parser.add_argument("source", help="Directory of job description files or a JSONL file")
+    add_parser.add_argument("--index", default="job_index", help="Index directory")
+    query_parser = subparsers.add_parser("query", help="Find the best-matching job descriptions")
+    query_parser.add_argument("--resume", required=True, help="Resume file (txt, md, pdf, docx)")
+    query_parser.add_argument("--index", default="job_index", help="Index directory")
+    query_parser.add_argument("-k", type=int, default=10, help="Number of results")
+    args = parser.parse_args(argv)
+
+    index = JobIndex(args.index)
+    if args.command == "add":
+        jobs = []
+        for job_id, text in load_job_descriptions(args.source):
+            try:
+                jobs.append((job_id, check_document_text(text, f"job description {job_id}")))
+            except ValueError as e:
+                print(f"Skipping: {e}", file=sys.stderr)
+        index.add_many(jobs)
+        print(f"Indexed {len(jobs)} job descriptions ({len(index)} total)")
+    else:
+        try:
+            resume = read_document(args.resume, "resume")
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        for result in index.query(resume, k=args.k):
+            print(f"{result['score']:.4f}  {result['id']}  (best section: {result['section']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+# jobs.py
+# This module contains a background job subsystem: a process-wide worker pool
+# that owns the optimization calls and a results store that outlives Streamlit
+# reruns, so the UI can poll job status instead of blocking on the LLM.
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import make_cache_key, normalize_text
+from tracing import increment
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+
+class JobManager:
+    """
+    Run callables on a bounded worker pool and keep their status and results.
+
+    Finished jobs are kept for ttl_seconds so a refreshed page can still collect them.
+
+    Submissions with the same dedupe_key while a job for it is queued or running
+    join that job instead of starting a new one (single-flight). A joined job is
+    only discarded once every subscriber has discarded it.
+    """
+
+    def __init__(self, max_workers=4, ttl_seconds=3600):
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="optimization-job")
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, metadata=None, dedupe_key=None, subscriber=None, **kwargs):
+        """
+        Queue func(*args, job_id=<new job ID>, **kwargs) and return the job ID.
+
+        The worker receives its job ID so it can publish partial progress with update().
+        If a job with the same dedupe_key is still in flight, its ID is returned instead
+        and subscriber (e.g. a session ID) is added to its subscribers.
+        """
+        self._prune()
+        with self._lock:
+            existing = self._jobs.get(self._in_flight.get(dedupe_key)) if dedupe_key is not None else None
+            if existing is not None:
+                existing["subscribers"].add(subscriber)
+                increment("singleflight", group="job", outcome="coalesced")
+                return existing["id"]
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": QUEUED,
+                "metadata": metadata or {},
+                "progress": {},
+                "result": None,
+                "error": None,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "dedupe_key": dedupe_key,
+                "subscribers": {subscriber},
+            }
+            if dedupe_key is not None:
+                self._in_flight[dedupe_key] = job_id
+        increment("singleflight", group="job", outcome="executed")
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        self._set(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = func(*args, job_id=job_id, **kwargs)
+        except Exception as e:
+            self._set(job_id, status=ERROR, error=str(e), finished_at=time.time())
+        else:
+            self._set(job_id, status=DONE, result=result, finished_at=time.time())
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and self._in_flight.get(job["dedupe_key"]) == job_id:
+                del self._in_flight[job["dedupe_key"]]
+
+    def _set(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def update(self, job_id, **progress):
+        """
+        Merge partial progress (e.g. sections streamed so far) into a running job.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["progress"] = {**job["progress"], **progress}
+
+    def get(self, job_id):
+        """
+        Return a snapshot of the job, or None if it is unknown or has expired.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return dict(job, progress=dict(job["progress"]), subscribers=set(job["subscribers"]))
+
+    def discard(self, job_id, subscriber=None):
+        """
+        Drop subscriber's interest in the job, and the job itself once nobody is subscribed.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["subscribers"].discard(subscriber)
+            if not job["subscribers"]:
+                del self._jobs[job_id]
+                if self._in_flight.get(job["dedupe_key"]) == job_id:
+                    del self._in_flight[job["dedupe_key"]]
+
+    def stats(self):
+        """
+        Count jobs by status.
+        """
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, ERROR: 0}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            return counts
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job["finished_at"] is not None and job["finished_at"] < cutoff]
+            for job_id in expired:
+                self._jobs.pop(job_id)
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+def get_job_manager():
+    """
+    Return the process-wide job manager shared by all sessions.
+    """
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
+
+
+def _run_optimization(base_resume, base_cover_letter, job_description, parallel=False, previous_input=None,
+                      previous_output=None, redo=(), context_owner=None, job_id=None):
+    from history import record_run
+
+    started = time.perf_counter()
+    output = _optimize(base_resume, base_cover_letter, job_description, parallel, previous_input, previous_output,
+                       redo, context_owner, job_id)
+    user_input = {
+        "base_resume": base_resume,
+        "base_cover_letter": base_cover_letter,
+        "job_description": job_description,
+    }
+    record_run(user_input, output, duration_seconds=time.perf_counter() - started, source="app")
+    return output
+
+
+def _optimize(base_resume, base_cover_letter, job_description, parallel, previous_input, previous_output, redo,
+              context_owner, job_id):
+    from ai_services import optimize_resume_incremental, optimize_resume_parallel, optimize_resume_stream
+    from utils import StreamingSectionParser
+
+    if previous_output is not None:
+        output, regenerated = optimize_resume_incremental(
+            base_resume, base_cover_letter, job_description, previous_input, previous_output, redo=redo,
+            context_owner=context_owner
+        )
+        get_job_manager().update(job_id, regenerated=regenerated)
+        return output
+
+    if parallel:
+        return optimize_resume_parallel(base_resume, base_cover_letter, job_description)
+
+    # Publish sections as they stream in so polling clients can show a live preview
+    manager = get_job_manager()
+    parser = StreamingSectionParser()
+    for chunk in optimize_resume_stream(base_resume, base_cover_letter, job_description,
+                                        context_owner=context_owner):
+        if parser.feed(chunk):
+            manager.update(job_id, **parser.sections)
+    manager.update(job_id, **parser.finish())
+    return parser.output
+
+
+def submit_optimization(base_resume, base_cover_letter, job_description, parallel=False, previous_input=None,
+                        previous_output=None, redo=(), context_owner=None):
+    """
+    Queue an optimization run in the background and return its job ID.
+
+    If previous_output is given, only the sections affected by the changes since
+    previous_input (plus the sections in redo) are regenerated; the list of
+    regenerated sections is published as the job's "regenerated" progress entry.
+    When every section would be regenerated anyway (e.g. a new job description),
+    the regular streaming or parallel run is used instead.
+
+    context_owner identifies the session for model context caching (see
+    ai_services._send_prompt_parts) and as the job's subscriber. Submissions that
+    would produce the same output while a job for it is in flight (a double click,
+    several sessions) join that job. The inputs are stored in the job's metadata so
+    a new session can restore them.
+    """
+    from ai_services import changed_inputs, needs_full_run, response_cache_key, sections_to_regenerate
+
+    user_input = {
+        "base_resume": base_resume,
+        "base_cover_letter": base_cover_letter,
+        "job_description": job_description,
+    }
+    dedupe_key = response_cache_key(base_resume, base_cover_letter, job_description)
+    if previous_output is not None and needs_full_run(previous_input, previous_output, user_input):
+        previous_input = previous_output = None
+    if previous_output is not None:
+        # Reused sections come from previous_output; previous_input only decides which ones
+        regenerate = sections_to_regenerate(changed_inputs(previous_input or {}, user_input), redo)
+        dedupe_key = make_cache_key(dedupe_key, normalize_text(previous_output), regenerate=regenerate)
+    return get_job_manager().submit(
+        _run_optimization, base_resume, base_cover_letter, job_description,
+        parallel=parallel, previous_input=previous_input, previous_output=previous_output, redo=tuple(redo),
+        context_owner=context_owner, metadata={"user_input": user_input}, subscriber=context_owner,
+        dedupe_key=dedupe_key,
+    )
@@ -0,0 +1,591 @@
+# llm_providers.py
+# This module contains the pluggable LLM backends used by ai_services:
+# Gemini and OpenAI adapters, a deterministic local stub for offline load
+# testing, and a router that sends requests to the fastest healthy backend.
+#
+# Select a backend with LLM_PROVIDER=gemini|openai|stub|fastest (default: gemini).
+#
+# Context caching: a long prompt prefix that is shared by many requests (the
+# instructions and base documents) can be registered once with create_context()
+# and referenced by its handle. Gemini stores it server-side (CachedContent);
+# other backends use a local stand-in that keeps the prefix first in every
+# prompt, which is what OpenAI's automatic prompt caching keys on.
+
+import hashlib
+import itertools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from preprocess import estimate_tokens
+
+DEFAULT_PROVIDER = "gemini"
+
+# Numbers local context registrations so a re-registered prefix never reuses a handle
+_local_context_ids = itertools.count(1)
+
+
+class LLMProvider:
+    """
+    Base class for LLM backends.
+
+    Subclasses implement generate() and stream(). Optional pricing (USD per million
+    tokens) is read from <NAME>_INPUT_COST and <NAME>_OUTPUT_COST so providers can be
+    compared on cost as well as latency.
+    """
+
+    name = "base"
+    model_name = ""
+    supports_context_cache = True
+
+    def __init__(self):
+        prefix = self.name.upper()
+        self.input_cost_per_million = _float_env(f"{prefix}_INPUT_COST")
+        self.output_cost_per_million = _float_env(f"{prefix}_OUTPUT_COST")
+        self._contexts = {}
+
+    @property
+    def cache_identity(self):
+        """
+        Identifies the backend and model in response cache keys.
+        """
+        return f"{self.name}:{self.model_name}"
+
+    def generate(self, prompt, temperature):
+        """
+        Return the complete response text for prompt.
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt, temperature):
+        """
+        Yield response text chunks as they are produced.
+        """
+        yield self.generate(prompt, temperature)
+
+    def estimate_cost(self, prompt, output):
+        """
+        Estimated cost in USD of one request, or None if pricing is not configured.
+        """
+        if self.input_cost_per_million is None or self.output_cost_per_million is None:
+            return None
+        return (estimate_tokens(prompt) * self.input_cost_per_million
+                + estimate_tokens(output) * self.output_cost_per_million) / 1_000_000
+
+    def is_available(self):
+        return True
+
+    def connect(self):
+        """
+        Create the API client now instead of on the first request (e.g. at server startup).
+        """
+
+    def create_context(self, prefix, ttl_seconds):
+        """
+        Register a prompt prefix for reuse and return its handle.
+
+        The base implementation is a local stand-in: the prefix is kept in memory and
+        sent in front of every suffix.
+        """
+        digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+        handle = f"local:{digest}:{next(_local_context_ids)}"
+        self._contexts[handle] = prefix
+        return handle
+
+    def delete_context(self, handle):
+        self._contexts.pop(handle, None)
+
+    def generate_with_context(self, handle, suffix, temperature):
+        """
+        Like generate(), for the prompt made of the registered prefix and suffix.
+        """
+        return self.generate(self._contexts[handle] + suffix, temperature)
+
+    def stream_with_context(self, handle, suffix, temperature):
+        """
+        Like stream(), for the prompt made of the registered prefix and suffix.
+        """
+        return self.stream(self._contexts[handle] + suffix, temperature)
+
+
+def _float_env(name):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Google Gemini via google-generativeai, with one configured model client per process.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model_name=None):
+        super().__init__()
+        self.model_name = model_name or os.getenv("GEMINI_MODEL", "models/gemini-2.0-pro-exp")
+        self._model = None
+        self._cached_models = {}
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        # The Gemini SDK is slow to import, so it is only imported and configured on first use
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+
+                # Configure the Gemini API with your API key
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    def generate(self, prompt, temperature):
+        response = self.model.generate_content(prompt, generation_config={"temperature": temperature})
+        return response.text
+
+    def stream(self, prompt, temperature):
+        response = self.model.generate_content(
+            prompt, generation_config={"temperature": temperature}, stream=True
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    def is_available(self):
+        return bool(os.getenv("GEMINI_API_KEY"))
+
+    def connect(self):
+        self.model
+
+    def create_context(self, prefix, ttl_seconds):
+        # Server-side context cache; models or prompts it does not support fall back to the local stand-in
+        import datetime
+        import google.generativeai as genai
+        from google.generativeai import caching
+
+        self.model
+        try:
+            cached_content = caching.CachedContent.create(
+                model=self.model_name, contents=[prefix], ttl=datetime.timedelta(seconds=ttl_seconds)
+            )
+        except Exception as e:
+            print(f"Gemini context caching unavailable, sending full prompts: {e}")
+            return super().create_context(prefix, ttl_seconds)
+        with self._lock:
+            self._cached_models[cached_content.name] = genai.GenerativeModel.from_cached_content(
+                cached_content=cached_content
+            )
+        return cached_content.name
+
+    def delete_context(self, handle):
+        with self._lock:
+            model = self._cached_models.pop(handle, None)
+        if model is None:
+            return super().delete_context(handle)
+        from google.generativeai import caching
+
+        try:
+            caching.CachedContent.get(handle).delete()
+        except Exception as e:
+            print(f"Could not delete Gemini cached content {handle}: {e}")
+
+    def generate_with_context(self, handle, suffix, temperature):
+        model = self._cached_models.get(handle)
+        if model is None:
+            return super().generate_with_context(handle, suffix, temperature)
+        response = model.generate_content(suffix, generation_config={"temperature": temperature})
+        return response.text
+
+    def stream_with_context(self, handle, suffix, temperature):
+        model = self._cached_models.get(handle)
+        if model is None:
+            yield from super().stream_with_context(handle, suffix, temperature)
+            return
+        response = model.generate_content(suffix, generation_config={"temperature": temperature}, stream=True)
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class OpenAIProvider(LLMProvider):
+    """
+    OpenAI chat completions, with one pooled client per process.
+    """
+
+    name = "openai"
+
+    def __init__(self, model_name=None):
+        super().__init__()
+        self.model_name = model_name or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+
+                self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            return self._client
+
+    def generate(self, prompt, temperature):
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+        )
+        return response.choices[0].message.content or ""
+
+    def stream(self, prompt, temperature):
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            stream=True,
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def is_available(self):
+        return bool(os.getenv("OPENAI_API_KEY"))
+
+    def connect(self):
+        self.client
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic local backend for offline load tests and benchmarks.
+
+    It waits first_token_latency seconds, then streams a well-formed response
+    (the same text for the same prompt) at tokens_per_second. Defaults come from
+    STUB_FIRST_TOKEN_LATENCY and STUB_TOKENS_PER_SECOND.
+    """
+
+    name = "stub"
+    model_name = "stub-1"
+
+    _DOCUMENT_RE = re.compile(r"---BASE RESUME---\n(.*?)(?:\n---|\Z)", re.DOTALL)
+
+    def __init__(self, first_token_latency=None, tokens_per_second=None, chunk_tokens=8):
+        super().__init__()
+        self.first_token_latency = (first_token_latency if first_token_latency is not None
+                                    else float(os.getenv("STUB_FIRST_TOKEN_LATENCY", "0.2")))
+        self.tokens_per_second = (tokens_per_second if tokens_per_second is not None
+                                  else float(os.getenv("STUB_TOKENS_PER_SECOND", "200")))
+        self.chunk_tokens = chunk_tokens
+
+    def render_response(self, prompt):
+        """
+        Build the deterministic response text for prompt.
+        """
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        percentage = 70 + int(digest[:2], 16) % 30
+        if "Output the final result in the following format" not in prompt:
+            # Single-section or analysis request (see ai_services.optimize_resume_parallel)
+            task_match = re.search(r"^Task: (.*)$", prompt, re.MULTILINE)
+            task = task_match.group(1) if task_match else "Response"
+            return f"{task} (stub response {digest[:8]}, estimated {percentage}%)\n"
+        match = self._DOCUMENT_RE.search(prompt)
+        resume = match.group(1).strip() if match else "Candidate Name\nSKILLS\n- Python"
+        return (
+            f"RESUME:\n{resume}\n\n"
+            f"COVER LETTER:\nDear Hiring Manager,\n\nI am excited to apply (ref {digest[:8]}).\n\n"
+            "ATS COMPATIBILITY ANALYSIS:\n```markdown\n## ATS Compatibility Analysis\n"
+            f"### Estimated ATS Passing Percentage: {percentage}%\n```\n\n"
+            "INTERVIEW PREPARATION:\n1. Discuss your most relevant project.\n"
+        )
+
+    def simulated_seconds(self, prompt):
+        """
+        Total time stream() spends sleeping for prompt, i.e. the simulated model latency.
+        """
+        chunks = -(-len(re.findall(r"\S+\s*", self.render_response(prompt))) // self.chunk_tokens)
+        delay = self.chunk_tokens / self.tokens_per_second if self.tokens_per_second else 0
+        return self.first_token_latency + max(chunks - 1, 0) * delay
+
+    def stream(self, prompt, temperature):
+        time.sleep(self.first_token_latency)
+        words = re.findall(r"\S+\s*", self.render_response(prompt))
+        delay = self.chunk_tokens / self.tokens_per_second if self.tokens_per_second else 0
+        for start in range(0, len(words), self.chunk_tokens):
+            if start and delay:
+                time.sleep(delay)
+            yield "".join(words[start:start + self.chunk_tokens])
+
+    def generate(self, prompt, temperature):
+        return "".join(self.stream(prompt, temperature))
+
+
+class FastestProviderRouter(LLMProvider):
+    """
+    Route each request to the available provider with the lowest observed latency.
+
+    Latency is tracked as an exponentially weighted moving average of time to first
+    chunk. Providers without measurements are tried first, and a provider that fails
+    is skipped for cooldown_seconds.
+    """
+
+    name = "fastest"
+    # Each request may go to a different backend, so prompts are always sent in full
+    supports_context_cache = False
+
+    def __init__(self, providers, smoothing=0.3, cooldown_seconds=60):
+        super().__init__()
+        self.providers = list(providers)
+        self.model_name = "+".join(provider.cache_identity for provider in self.providers)
+        self.smoothing = smoothing
+        self.cooldown_seconds = cooldown_seconds
+        self._latency = {}
+        self._failed_until = {}
+        self._lock = threading.Lock()
+
+    def choose(self):
+        now = time.monotonic()
+        with self._lock:
+            candidates = [p for p in self.providers
+                          if p.is_available() and self._failed_until.get(p.name, 0) <= now]
+            if not candidates:
+                raise RuntimeError("No LLM provider is available")
+            return min(candidates, key=lambda p: self._latency.get(p.name, -1.0))
+
+    def _record(self, provider, latency=None, failed=False):
+        with self._lock:
+            if failed:
+                self._failed_until[provider.name] = time.monotonic() + self.cooldown_seconds
+                return
+            previous = self._latency.get(provider.name)
+            self._latency[provider.name] = latency if previous is None else (
+                self.smoothing * latency + (1 - self.smoothing) * previous
+            )
+
+    def connect(self):
+        for provider in self.providers:
+            if provider.is_available():
+                provider.connect()
+
+    def latencies(self):
+        with self._lock:
+            return dict(self._latency)
+
+    def stream(self, prompt, temperature):
+        provider = self.choose()
+        started = time.perf_counter()
+        first_chunk = True
+        try:
+            for chunk in provider.stream(prompt, temperature):
+                if first_chunk:
+                    self._record(provider, time.perf_counter() - started)
+                    first_chunk = False
+                yield chunk
+        except Exception:
+            self._record(provider, failed=True)
+            raise
+
+    def generate(self, prompt, temperature):
+        return "".join(self.stream(prompt, temperature))
+
+
+class ContextRegistry:
+    """
+    Track the cached contexts registered with providers, keyed by provider object and prefix content.
+
+    Contexts are leased: acquire() returns an entry whose "handle" stays valid until the
+    matching release(). Concurrent misses for the same key register the context once.
+
+    A context is reused until it is within refresh_margin_seconds of its TTL, then
+    re-registered. When an owner (e.g. a user session) switches to a new prefix
+    because their base documents changed, the context of the old prefix is retired
+    right away unless another owner still uses it. At most max_entries contexts are
+    kept; the least recently used ones are retired first, and expired ones are retired
+    as they reach the least recently used end. Retiring a context forgets its owners.
+    A retired context is deleted once its last lease is released.
+    """
+
+    def __init__(self, ttl_seconds=3600, max_entries=64, refresh_margin_seconds=60):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._entries = OrderedDict()
+        self._owners = {}
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "expired": 0, "invalidated": 0, "evicted": 0}
+
+    def acquire(self, provider, prefix, owner=None):
+        """
+        Lease a live context for prefix on provider, registering it if needed.
+
+        The handle is only valid for the provider object it was registered with, so
+        contexts are not shared between provider instances with the same model.
+
+        Returns:
+        - The registry entry; use entry["handle"] and pass the entry to release() when done
+        """
+        # Keying on the provider object keeps it (and therefore its id) alive with the entry
+        key = (provider, hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+        stale = []
+        with self._lock:
+            # Expired contexts at the least recently used end go now, with their owners
+            now = time.time()
+            while self._entries:
+                oldest_key, oldest = next(iter(self._entries.items()))
+                if oldest_key == key or not self._expired(oldest, now):
+                    break
+                self._retire(oldest_key, stale)
+                self._stats["expired"] += 1
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._retire(key, stale)
+                self._stats["expired"] += 1
+                entry = None
+            creating = entry is None
+            if creating:
+                entry = {"provider": provider, "handle": None, "expires_at": None, "users": 0,
+                         "owners": set(), "retired": False, "ready": threading.Event(), "error": None}
+                self._entries[key] = entry
+                self._stats["created"] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._stats["reused"] += 1
+            entry["users"] += 1
+            if owner is not None:
+                self._assign_owner(owner, key, entry, stale)
+            while len(self._entries) > self.max_entries:
+                self._retire(next(iter(self._entries)), stale)
+                self._stats["evicted"] += 1
+        self._delete(stale)
+
+        if not creating:
+            # Another request is registering this context; wait for its handle
+            entry["ready"].wait()
+            if entry["error"] is not None:
+                self.release(entry)
+                raise entry["error"]
+            return entry
+
+        # Registering may be a network call, so it runs outside the lock
+        try:
+            handle = provider.create_context(prefix, self.ttl_seconds)
+        except Exception as e:
+            with self._lock:
+                entry["error"] = e
+                if self._entries.get(key) is entry:
+                    self._retire(key, [])
+                entry["retired"] = True
+                entry["users"] -= 1
+            entry["ready"].set()
+            raise
+        entry["handle"] = handle
+        entry["expires_at"] = time.time() + self.ttl_seconds
+        entry["ready"].set()
+        return entry
+
+    def release(self, entry):
+        """
+        End a lease from acquire(); deletes the context if it was retired meanwhile.
+        """
+        stale = []
+        with self._lock:
+            entry["users"] -= 1
+            if entry["retired"]:
+                self._delete_when_unused(entry, stale)
+        self._delete(stale)
+
+    def _expired(self, entry, now):
+        return entry["expires_at"] is not None and entry["expires_at"] - self.refresh_margin_seconds <= now
+
+    def _assign_owner(self, owner, key, entry, stale):
+        # Called with the lock held; the old prefix is retired when its last owner moves away
+        previous = self._owners.get(owner)
+        if previous == key:
+            return
+        self._owners[owner] = key
+        entry["owners"].add(owner)
+        previous_entry = self._entries.get(previous) if previous is not None else None
+        if previous_entry is not None:
+            previous_entry["owners"].discard(owner)
+            if not previous_entry["owners"]:
+                self._retire(previous, stale)
+                self._stats["invalidated"] += 1
+
+    def _retire(self, key, stale):
+        # Called with the lock held; contexts still leased are deleted by the last release()
+        entry = self._entries.pop(key)
+        entry["retired"] = True
+        for owner in entry["owners"]:
+            if self._owners.get(owner) == key:
+                del self._owners[owner]
+        entry["owners"].clear()
+        self._delete_when_unused(entry, stale)
+
+    def _delete_when_unused(self, entry, stale):
+        if entry["users"] == 0 and entry["handle"] is not None:
+            stale.append((entry["provider"], entry["handle"]))
+            entry["handle"] = None
+
+    def _delete(self, contexts):
+        for provider, handle in contexts:
+            try:
+                provider.delete_context(handle)
+            except Exception as e:
+                print(f"Could not delete cached context {handle}: {e}")
+
+    def clear(self):
+        stale = []
+        with self._lock:
+            for key in list(self._entries):
+                self._retire(key, stale)
+            self._owners.clear()
+        self._delete(stale)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, live=len(self._entries), owners=len(self._owners),
+                        leased=sum(entry["users"] for entry in self._entries.values()))
+
+
+_context_registry = None
+
+def get_context_registry():
+    """
+    Return the process-wide context registry (TTL from CONTEXT_CACHE_TTL, default one hour).
+    """
+    global _context_registry
+    with _provider_lock:
+        if _context_registry is None:
+            _context_registry = ContextRegistry(ttl_seconds=int(os.getenv("CONTEXT_CACHE_TTL", "3600")))
+        return _context_registry
+
+
+PROVIDERS = {
+    "gemini": GeminiProvider,
+    "openai": OpenAIProvider,
+    "stub": StubProvider,
+}
+
+_provider_instances = {}
+_provider_lock = threading.Lock()
+
+def get_provider(name=None):
+    """
+    Return the process-wide provider instance for name (default: LLM_PROVIDER env var).
+
+    "fastest" returns a router over every configured provider.
+    """
+    name = (name or os.getenv("LLM_PROVIDER", DEFAULT_PROVIDER)).lower()
+    with _provider_lock:
+        if name not in _provider_instances:
+            if name == "fastest":
+                routed = os.getenv("LLM_ROUTER_PROVIDERS", "gemini,openai").split(",")
+                _provider_instances[name] = FastestProviderRouter(
+                    [PROVIDERS[n.strip()]() for n in routed if n.strip()]
+                )
+            elif name in PROVIDERS:
+                _provider_instances[name] = PROVIDERS[name]()
+            else:
+                raise ValueError(f"Unknown LLM provider: {name}")
+        return _provider_instances[name]
@@ -0,0 +1,172 @@
+# preprocess.py
+# This module contains a cheap local pre-analysis of the job description that
+# shrinks the prompt sent to the LLM (boilerplate removal, de-duplication and
+# relevance filtering), plus a rough token estimate used to report the savings.
+
+import re
+
+from ats_scorer import DEFAULT_KEYWORD_INDEX, tokenize
+
+# Bump whenever the preprocessing rules change; part of the response cache key
+PREPROCESS_VERSION = "1"
+
+# Job descriptions below this estimated size are only cleaned, never relevance-filtered
+RELEVANCE_FILTER_MIN_TOKENS = 600
+
+# Leading lines (title, company, location) that are always kept
+KEEP_LEADING_LINES = 3
+
+# Lines whose word sets overlap at least this much with an earlier line are dropped
+DUPLICATE_JACCARD_THRESHOLD = 0.8
+
+# Headers that start a boilerplate block; everything until the next header is dropped
+_BOILERPLATE_HEADER_RE = re.compile(
+    r"^\W*(benefits|perks|what we offer|our benefits|compensation( and benefits)?|equal (employment )?opportunity"
+    r"|eeo statement|diversity( and inclusion)?|accommodations?|privacy( notice| policy)?"
+    r"|legal|disclaimer|pay transparency)\W*$",
+    re.IGNORECASE,
+)
+
+# Individual sentences or lines that are boilerplate wherever they appear
+_BOILERPLATE_LINE_RE = re.compile(
+    r"equal opportunity employer|without regard to (race|age|sex)|protected veteran|sexual orientation"
+    r"|gender identity|reasonable accommodation|e-verify|background check|401\(?k\)?|paid time off"
+    r"|health,? dental|dental,? and vision|parental leave|tuition reimbursement|wellness (program|stipend)"
+    r"|applicant privacy|privacy notice|by applying|recruitment agencies|unsolicited resumes"
+    r"|salary range|pay range|base pay|this job posting",
+    re.IGNORECASE,
+)
+
+# Any short line ending with a colon, or in title case / all caps, is treated as a header
+_HEADER_RE = re.compile(r"^[#\s]*[A-Za-z][A-Za-z &/'-]{1,40}:?\s*$")
+
+# Cue words marking requirement lines, which are kept even without resume overlap
+_REQUIREMENT_CUE_RE = re.compile(
+    r"\b(require|must|responsib|qualif|experience (with|in)|proficien|knowledge of|degree|certif)",
+    re.IGNORECASE,
+)
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_BULLET_RE = re.compile(r"^[\s•\-\*\+◦○►▪➢➤]+")
+
+
+def estimate_tokens(text):
+    """
+    Rough token estimate (about four characters per token for English text).
+    """
+    return (len(text) + 3) // 4 if text else 0
+
+
+def _is_header(line):
+    return bool(_HEADER_RE.match(line)) and (line.rstrip().endswith(":") or line.isupper() or line.istitle())
+
+
+def _normalized_words(line):
+    return set(re.findall(r"[a-z0-9+#]+", _BULLET_RE.sub("", line).lower()))
+
+
+def preprocess_job_description(job_description, resume_text=""):
+    """
+    Remove boilerplate, de-duplicate repeated requirements and, for long
+    postings, keep only the sentences relevant to the resume.
+
+    Returns:
+    - (processed_text, report) where report is a dictionary with the original and
+      processed token estimates and counts of removed lines/sentences
+    """
+    report = {
+        "original_tokens": estimate_tokens(job_description or ""),
+        "removed_boilerplate": 0,
+        "removed_duplicates": 0,
+        "removed_irrelevant": 0,
+    }
+    if not job_description:
+        report["processed_tokens"] = 0
+        report["saved_tokens"] = 0
+        return "", report
+
+    lines = job_description.replace("\r\n", "\n").split("\n")
+    kept = []
+    seen_word_sets = []
+    in_boilerplate_block = False
+
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            if kept and kept[-1]:
+                kept.append("")
+            continue
+
+        # Boilerplate sections run from their header until the next header
+        if _BOILERPLATE_HEADER_RE.match(stripped):
+            in_boilerplate_block = True
+            report["removed_boilerplate"] += 1
+            continue
+        if in_boilerplate_block:
+            if _is_header(stripped):
+                in_boilerplate_block = False
+            else:
+                report["removed_boilerplate"] += 1
+                continue
+
+        # Drop boilerplate sentences within otherwise useful lines
+        sentences = _SENTENCE_RE.split(stripped)
+        useful = [s for s in sentences if not _BOILERPLATE_LINE_RE.search(s)]
+        report["removed_boilerplate"] += len(sentences) - len(useful)
+        if not useful:
+            continue
+        stripped = " ".join(useful)
+
+        # Drop exact and near-duplicate requirement lines
+        words = _normalized_words(stripped)
+        if words and any(
+            words == previous
+            or (len(words) > 2 and len(words & previous) / len(words | previous) >= DUPLICATE_JACCARD_THRESHOLD)
+            for previous in seen_word_sets
+        ):
+            report["removed_duplicates"] += 1
+            continue
+        seen_word_sets.append(words)
+        kept.append(stripped)
+
+    processed = "\n".join(kept).strip()
+
+    if estimate_tokens(processed) >= RELEVANCE_FILTER_MIN_TOKENS and resume_text:
+        processed, report["removed_irrelevant"] = _filter_relevant(processed, resume_text)
+
+    report["processed_tokens"] = estimate_tokens(processed)
+    report["saved_tokens"] = report["original_tokens"] - report["processed_tokens"]
+    return processed, report
+
+
+def _filter_relevant(job_description, resume_text):
+    """
+    Keep headers, leading lines, requirement lines and sentences that share terms
+    or skills with the resume. Returns (filtered_text, dropped_sentence_count).
+    """
+    resume_terms = set(tokenize(resume_text))
+    skill_index = DEFAULT_KEYWORD_INDEX
+    kept_lines = []
+    dropped = 0
+    non_empty_seen = 0
+
+    for line in job_description.split("\n"):
+        if not line.strip():
+            kept_lines.append(line)
+            continue
+        non_empty_seen += 1
+        if non_empty_seen <= KEEP_LEADING_LINES or _is_header(line):
+            kept_lines.append(line)
+            continue
+        kept_sentences = []
+        for sentence in _SENTENCE_RE.split(line):
+            if (_REQUIREMENT_CUE_RE.search(sentence)
+                    or skill_index.find(sentence)
+                    or resume_terms.intersection(tokenize(sentence))):
+                kept_sentences.append(sentence)
+            else:
+                dropped += 1
+        if kept_sentences:
+            kept_lines.append(" ".join(kept_sentences))
+
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept_lines)).strip(), dropped
@@ -0,0 +1,230 @@
+# tracing.py
+# This module contains lightweight hot-path instrumentation: timed spans with
+# attributes (input sizes, token counts), an in-memory ring buffer for
+# per-stage p50/p95 statistics, event counters, a JSONL file exporter and a
+# Prometheus-style text endpoint.
+#
+# Configuration:
+#   TRACE_FILE=traces.jsonl   append every finished span to a JSONL file
+#   TRACE_METRICS_PORT=9464   serve /metrics in Prometheus text format
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Number of recent spans kept per stage for percentile statistics
+MAX_SPANS_PER_STAGE = 1000
+
+_lock = threading.Lock()
+_spans = {}
+_totals = {}
+_counters = {}
+_trace_file = os.getenv("TRACE_FILE", "")
+_metrics_server = None
+
+
+class Span:
+    """
+    A timed stage. Attributes added with set() are exported with the duration.
+    """
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.error = None
+        self._start = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def _finish(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self):
+        record = {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            **self.attributes,
+        }
+        if self.error:
+            record["error"] = self.error
+        return record
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time the enclosed block as a span named name.
+
+    Usage:
+        with span("extract_text", file_type="pdf") as s:
+            text = ...
+            s.set(output_chars=len(text))
+    """
+    current = Span(name, attributes)
+    try:
+        yield current
+    except Exception as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current._finish()
+        record_span(current)
+
+
+def traced(name=None):
+    """
+    Decorator form of span(); the span is named after the function by default.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_span(finished_span):
+    """
+    Store a finished span for statistics and export it to TRACE_FILE if configured.
+    """
+    with _lock:
+        stage = _spans.setdefault(finished_span.name, deque(maxlen=MAX_SPANS_PER_STAGE))
+        stage.append(finished_span.duration_ms)
+        count, total_ms, errors = _totals.get(finished_span.name, (0, 0.0, 0))
+        _totals[finished_span.name] = (
+            count + 1, total_ms + finished_span.duration_ms, errors + (1 if finished_span.error else 0)
+        )
+        if _trace_file:
+            with open(_trace_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(finished_span.to_dict(), ensure_ascii=False) + "\n")
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def stage_stats():
+    """
+    Per-stage statistics over the recent spans.
+
+    Returns:
+    - A dictionary mapping stage name to count, errors, p50_ms, p95_ms and max_ms
+    """
+    with _lock:
+        snapshot = {name: sorted(durations) for name, durations in _spans.items()}
+        totals = dict(_totals)
+    stats = {}
+    for name, durations in snapshot.items():
+        count, total_ms, errors = totals[name]
+        stats[name] = {
+            "count": count,
+            "errors": errors,
+            "mean_ms": total_ms / count if count else 0.0,
+            "p50_ms": _percentile(durations, 0.5),
+            "p95_ms": _percentile(durations, 0.95),
+            "max_ms": durations[-1] if durations else 0.0,
+        }
+    return stats
+
+
+def increment(name, value=1, **labels):
+    """
+    Add value to the counter name with the given labels, e.g. increment("singleflight", group="extract").
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def counters():
+    """
+    Returns:
+    - A dictionary mapping (name, ((label, value), ...)) to the counter's total
+    """
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _totals.clear()
+        _counters.clear()
+
+
+def render_prometheus():
+    """
+    Render stage statistics in the Prometheus text exposition format.
+    """
+    lines = [
+        "# HELP resume_agent_stage_duration_ms Stage duration quantiles over recent spans.",
+        "# TYPE resume_agent_stage_duration_ms summary",
+    ]
+    for name, stats in sorted(stage_stats().items()):
+        lines.append(f'resume_agent_stage_duration_ms{{stage="{name}",quantile="0.5"}} {stats["p50_ms"]:.3f}')
+        lines.append(f'resume_agent_stage_duration_ms{{stage="{name}",quantile="0.95"}} {stats["p95_ms"]:.3f}')
+        lines.append(f'resume_agent_stage_duration_ms_sum{{stage="{name}"}} {stats["mean_ms"] * stats["count"]:.3f}')
+        lines.append(f'resume_agent_stage_duration_ms_count{{stage="{name}"}} {stats["count"]}')
+    lines.append("# HELP resume_agent_stage_errors_total Spans that raised an exception.")
+    lines.append("# TYPE resume_agent_stage_errors_total counter")
+    for name, stats in sorted(stage_stats().items()):
+        lines.append(f'resume_agent_stage_errors_total{{stage="{name}"}} {stats["errors"]}')
+    previous_name = None
+    for (name, labels), value in sorted(counters().items()):
+        if name != previous_name:
+            lines.append(f"# TYPE resume_agent_{name}_total counter")
+            previous_name = name
+        label_text = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+        lines.append(f"resume_agent_{name}_total{{{label_text}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port=None):
+    """
+    Serve /metrics on a background thread (once per process). Returns the server or None.
+    """
+    global _metrics_server
+    port = port or os.getenv("TRACE_METRICS_PORT")
+    if not port:
+        return None
+    with _lock:
+        if _metrics_server is not None:
+            return _metrics_server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            _metrics_server = ThreadingHTTPServer(("0.0.0.0", int(port)), MetricsHandler)
+        except OSError as e:
+            print(f"Could not start metrics server on port {port}: {e}")
+            return None
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+        return _metrics_server
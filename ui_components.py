@@ -1,9 +1,17 @@
+import functools
+import os
 import streamlit as st
 
 def load_css(file_path):
     """
     Load and apply custom CSS from a file.
+
+    The file is read once per process and re-read only when it changes on disk.
     """
+    return _read_css(file_path, os.path.getmtime(file_path))
+
+@functools.lru_cache(maxsize=8)
+def _read_css(file_path, mtime):
     with open(file_path, "r") as f:
         return f.read()
 
@@ -165,3 +173,47 @@ def render_input_method_selection(is_mobile):
             job_desc_input_method = st.radio("Job Description Input Method:", ["Paste Text", "Upload File"], key="job_desc_method")
 
     return resume_input_method, cover_letter_input_method, job_desc_input_method
+
+def render_ats_score(result, label="Local ATS keyword score", baseline=None):
+    """
+    Render a local ATS score (see ats_scorer.score_resume) with matched and missing keywords.
+
+    If a baseline result is given, the change in score is shown as the metric delta.
+    """
+    delta = None
+    if baseline is not None:
+        delta = f"{result['score'] - baseline['score']:+d} pts vs. base resume"
+    st.metric(label, f"{result['score']}%", delta=delta)
+    if result["matched_skills"]:
+        st.markdown("**Matched skills:** " + ", ".join(result["matched_skills"]))
+    if result["missing_skills"]:
+        st.markdown("**Missing skills:** " + ", ".join(result["missing_skills"]))
+    if result["missing_terms"]:
+        st.markdown("**Top missing terms:** " + ", ".join(result["missing_terms"]))
+
+def render_diagnostics_panel(stats, counters=None):
+    """
+    Render per-stage latency statistics (see tracing.stage_stats) as a table, followed
+    by event counters (see tracing.counters) such as calls saved by request coalescing.
+    """
+    with st.expander("Diagnostics: latency per stage"):
+        if counters:
+            st.caption(" · ".join(
+                f"{name} {' '.join(str(value) for _, value in labels)}: {total}"
+                for (name, labels), total in sorted(counters.items())
+            ))
+        if not stats:
+            st.caption("No spans recorded yet in this process.")
+            return
+        rows = [
+            {
+                "Stage": name,
+                "Count": values["count"],
+                "Errors": values["errors"],
+                "p50 (ms)": round(values["p50_ms"], 1),
+                "p95 (ms)": round(values["p95_ms"], 1),
+                "Max (ms)": round(values["max_ms"], 1),
+            }
+            for name, values in sorted(stats.items(), key=lambda item: -item[1]["p95_ms"])
+        ]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
@@ -1,45 +1,351 @@
 # utils.py
 # This module contains utility functions for extracting text from files
 
+import hashlib
 import io
+import multiprocessing
+import os
 import re
-import PyPDF2
-from docx import Document
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-def extract_text_from_file(uploaded_file):
+from cache import SingleFlight, build_cache
+from tracing import increment, span
+
+# Bump whenever extraction output changes so cached text from older parsers is not reused
+PARSER_VERSION = "4"
+
+# PDFs with at least this many pages are split across a process pool
+PARALLEL_PDF_MIN_PAGES = 16
+
+# Fewest pages handed to one worker task when extracting in parallel
+PDF_PAGES_PER_TASK = 8
+
+# Worker processes shared by all PDF extractions in this process
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Seconds a caller waits for an identical extraction already in progress
+EXTRACTION_WAIT_TIMEOUT = 120
+
+def _as_stream(uploaded_file):
+    """
+    Return a seekable binary stream over the upload without copying its bytes.
+    """
+    if hasattr(uploaded_file, "seek") and hasattr(uploaded_file, "read"):
+        uploaded_file.seek(0)
+        return uploaded_file
+    return io.BytesIO(uploaded_file.getvalue())
+
+def _as_memoryview(uploaded_file):
+    """
+    Return a memoryview of the upload's bytes, sharing the buffer when possible.
+    """
+    if hasattr(uploaded_file, "getbuffer"):
+        return uploaded_file.getbuffer()
+    return memoryview(uploaded_file.getvalue())
+
+def iter_pdf_pages(uploaded_file):
+    """
+    Lazily yield the text of each PDF page, one page at a time.
+    """
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(_as_stream(uploaded_file))
+    for page in pdf_reader.pages:
+        yield page.extract_text() or ""
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def get_pdf_pool():
+    """
+    Return the process pool shared by all PDF extractions, created on first use.
+
+    The app and API servers are multithreaded, so workers are started with forkserver
+    (or spawn where that is unavailable) rather than by forking the server.
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=context)
+        return _pdf_pool
+
+def _discard_pdf_pool(pool):
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    # Its pending tasks have already failed with BrokenProcessPool
+    pool.shutdown(wait=False)
+
+def _extract_pdf_page_range(pdf_bytes, start, stop):
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    return [(pdf_reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+def extract_pdf_text(uploaded_file, max_workers=None):
+    """
+    Extract all text from a PDF, splitting page ranges across the shared process pool for large files.
+
+    Each task gets one contiguous page range and a copy of the PDF bytes, so the bytes
+    are sent at most once per worker. Page texts are collected in order and joined once at the end.
+    """
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(_as_stream(uploaded_file))
+    page_count = len(pdf_reader.pages)
+    tasks = min(max_workers or PDF_WORKERS, PDF_WORKERS, -(-page_count // PDF_PAGES_PER_TASK))
+
+    pages = None
+    if page_count >= PARALLEL_PDF_MIN_PAGES and tasks >= 2:
+        pages_per_task = -(-page_count // tasks)
+        starts = range(0, page_count, pages_per_task)
+        stops = [min(start + pages_per_task, page_count) for start in starts]
+        pdf_bytes = _as_memoryview(uploaded_file).tobytes()
+        pool = get_pdf_pool()
+        try:
+            pages = []
+            for page_texts in pool.map(_extract_pdf_page_range, [pdf_bytes] * len(starts), starts, stops):
+                pages.extend(page_texts)
+        except BrokenProcessPool as e:
+            # A worker died; replace the pool for later calls and extract this file in-process
+            increment("pdf_pool_fallback", error=type(e).__name__)
+            _discard_pdf_pool(pool)
+            pages = None
+    if pages is None:
+        pages = [(page.extract_text() or "") for page in pdf_reader.pages]
+
+    return "".join(page + "\n" for page in pages)
+
+# WordprocessingML element tags, as seen by ElementTree
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+_DOCX_RUN_TEXT = {_W + "t": None, _W + "tab": "\t", _W + "ptab": "\t", _W + "cr": "\n",
+                  _W + "noBreakHyphen": "-"}
+
+# Separator between the cells of a table row
+DOCX_CELL_SEPARATOR = " | "
+
+def iter_docx_paragraphs(uploaded_file):
+    """
+    Lazily yield the text of each paragraph in a DOCX body, in document order.
+
+    word/document.xml is read with incremental parsing straight from the zip archive,
+    and every element is discarded once its text has been yielded, so memory stays
+    flat on large documents. Each table row is yielded as one line, with its cells
+    joined by DOCX_CELL_SEPARATOR (paragraphs within a cell, and nested tables, are
+    joined by spaces). Text boxes are included once: Word also writes a legacy (VML)
+    copy of each one under mc:Fallback, which is skipped, and the paragraph anchoring
+    a text box is not yielded when it has no text of its own. Headers, footers and
+    deleted (tracked-change) text are not included.
+    """
+    from xml.etree.ElementTree import iterparse
+
+    with zipfile.ZipFile(_as_stream(uploaded_file)) as archive, archive.open("word/document.xml") as xml:
+        body = None
+        paragraphs = []       # stack of text pieces for the open (possibly nested) paragraphs
+        anchors = []          # whether each open paragraph contains a text box paragraph
+        run_depth = 0
+        fallback_depth = 0
+        table_depth = 0
+        row_cells = []
+        cell_texts = []
+        for event, elem in iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+            if tag == _MC_FALLBACK:
+                fallback_depth += 1 if event == "start" else -1
+                continue
+            if fallback_depth:
+                continue
+            if event == "start":
+                if tag == _W + "p":
+                    paragraphs.append([])
+                    anchors.append(False)
+                elif tag == _W + "r":
+                    run_depth += 1
+                elif tag == _W + "tbl":
+                    table_depth += 1
+                elif tag == _W + "tc" and table_depth == 1:
+                    cell_texts = []
+                elif tag == _W + "body":
+                    body = elem
+                continue
+
+            if tag in _DOCX_RUN_TEXT:
+                if run_depth and paragraphs:
+                    text = _DOCX_RUN_TEXT[tag]
+                    paragraphs[-1].append((elem.text or "") if text is None else text)
+            elif tag == _W + "br":
+                if run_depth and paragraphs and elem.get(_W + "type", "textWrapping") == "textWrapping":
+                    paragraphs[-1].append("\n")
+            elif tag == _W + "r":
+                run_depth -= 1
+            elif tag == _W + "p":
+                text = "".join(paragraphs.pop())
+                anchor = anchors.pop()
+                if anchors:
+                    anchors[-1] = True
+                if table_depth:
+                    if text.strip():
+                        cell_texts.append(text.strip())
+                elif text or not anchor:
+                    yield text
+                elem.clear()
+            elif tag == _W + "tc" and table_depth == 1:
+                row_cells.append(" ".join(cell_texts))
+            elif tag == _W + "tr" and table_depth == 1:
+                if any(row_cells):
+                    yield DOCX_CELL_SEPARATOR.join(cell for cell in row_cells if cell)
+                row_cells = []
+            elif tag == _W + "tbl":
+                table_depth -= 1
+
+            # Drop finished top-level blocks so the tree never holds more than one of them
+            if body is not None and not paragraphs and not table_depth and tag in (_W + "p", _W + "tbl", _W + "sdt"):
+                body.clear()
+
+def extract_docx_text(uploaded_file):
+    """
+    Extract the text of a DOCX file, including table cells (see iter_docx_paragraphs).
+    """
+    return "\n".join(iter_docx_paragraphs(uploaded_file))
+
+_extraction_cache = None
+
+# Concurrent uploads of the same document (keyed like the extraction cache) are parsed once
+_extraction_flights = SingleFlight("extract", timeout_seconds=EXTRACTION_WAIT_TIMEOUT)
+
+def get_extraction_cache():
+    """
+    Return the process-wide extraction cache, shared by all Streamlit sessions.
+
+    The on-disk tier is only used when EXTRACTION_CACHE_PATH is set.
+    """
+    global _extraction_cache
+    if _extraction_cache is None:
+        _extraction_cache = build_cache("extraction", max_entries=64, persistent=False)
+    return _extraction_cache
+
+def extraction_cache_key(uploaded_file, file_extension):
+    """
+    Key an upload by the SHA-256 of its content, its file type and the parser version.
+    """
+    digest = hashlib.sha256(_as_memoryview(uploaded_file)).hexdigest()
+    return f"{digest}:{file_extension}:{PARSER_VERSION}"
+
+def _extract_text(uploaded_file, file_extension):
+    if file_extension == "txt":
+        # For text files, decode straight from the upload's buffer
+        return str(_as_memoryview(uploaded_file), "utf-8")
+
+    elif file_extension == "pdf":
+        # For PDF files, use PyPDF2 (parallel for large documents)
+        return extract_pdf_text(uploaded_file)
+
+    elif file_extension == "docx":
+        # For DOCX files, stream the document XML (paragraphs and table cells)
+        return extract_docx_text(uploaded_file)
+
+    return None
+
+def _extract_and_cache(uploaded_file, file_extension, cache, cache_key):
+    text = _extract_text(uploaded_file, file_extension)
+    if text is not None:
+        cache.set(cache_key, text)
+    return text
+
+def extract_text_from_file(uploaded_file, use_cache=True):
     """
     Extract text from various file formats (txt, pdf, docx)
+
+    Results are memoized by file content, so Streamlit reruns and other sessions
+    uploading the same document do not parse it again. Identical uploads arriving
+    while the first is still being parsed wait for that parse instead of repeating it.
     """
     if uploaded_file is None:
         return ""
         
     file_extension = uploaded_file.name.split(".")[-1].lower()
     
-    try:
-        if file_extension == "txt":
-            # For text files, read directly
-            return uploaded_file.getvalue().decode("utf-8")
-            
-        elif file_extension == "pdf":
-            # For PDF files, use PyPDF2
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.getvalue()))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+    with span("extract_text", file_type=file_extension) as extract_span:
+        try:
+            cache = get_extraction_cache() if use_cache else None
+            if cache is not None:
+                cache_key = extraction_cache_key(uploaded_file, file_extension)
+                cached_text = cache.get(cache_key)
+                extract_span.set(cache_hit=cached_text is not None)
+                if cached_text is not None:
+                    extract_span.set(output_chars=len(cached_text))
+                    return cached_text
+
+            extract_span.set(input_bytes=len(_as_memoryview(uploaded_file)))
+            if cache is not None:
+                text = _extraction_flights.do(cache_key, _extract_and_cache, uploaded_file, file_extension,
+                                              cache, cache_key)
+            else:
+                text = _extract_text(uploaded_file, file_extension)
+            if text is None:
+                return "Unsupported file format"
+            extract_span.set(output_chars=len(text))
             return text
-            
-        elif file_extension == "docx":
-            # For DOCX files, use python-docx
-            doc = Document(io.BytesIO(uploaded_file.getvalue()))
-            text = []
-            for para in doc.paragraphs:
-                text.append(para.text)
-            return "\n".join(text)
-            
-        else:
-            return "Unsupported file format"
-    except Exception as e:
-        return f"Error extracting text: {str(e)}"
+        except Exception as e:
+            extract_span.set(failed=type(e).__name__)
+            return f"Error extracting text: {str(e)}"
+
+# Resume section headers (matched against the stripped, upper-cased line)
+_SKILLS_HEADER_RE = re.compile(r'(SKILLS|TECHNICAL SKILLS|EXPERTISE|CORE COMPETENCIES|KEY SKILLS)')
+_EXPERIENCE_HEADER_RE = re.compile(r'(EXPERIENCE|WORK EXPERIENCE|PROFESSIONAL EXPERIENCE|EMPLOYMENT HISTORY)')
+_EDUCATION_HEADER_RE = re.compile(r'(EDUCATION)')
+_OTHER_HEADER_RE = re.compile(r'(PROJECTS|ACHIEVEMENTS|CERTIFICATIONS|LANGUAGES|INTERESTS)')
+_BULLET_PREFIX_RE = re.compile(r'^[\s]*[•\-\*\+◦◘○◙♦❖⬧➢➤➔➧►❯❱]+\s*')
+
+def classify_section_header(line):
+    """
+    Return "SKILLS", "EXPERIENCE", "EDUCATION" or "OTHER" if the line starts a resume
+    section, else None.
+    """
+    normalized = line.strip().upper()
+    if _SKILLS_HEADER_RE.match(normalized):
+        return "SKILLS"
+    if _EXPERIENCE_HEADER_RE.match(normalized):
+        return "EXPERIENCE"
+    if _EDUCATION_HEADER_RE.match(normalized):
+        return "EDUCATION"
+    if _OTHER_HEADER_RE.match(normalized):
+        return "OTHER"
+    return None
+
+def split_into_sections(text):
+    """
+    Split a document into sections at the headers recognized by classify_section_header.
+
+    Returns:
+    - A list of (section, text) tuples, where section is "SKILLS", "EXPERIENCE",
+      "EDUCATION", "OTHER", or "HEADER" for any text before the first recognized header
+    """
+    return list(iter_sections((text or "").split('\n')))
+
+def iter_sections(lines):
+    """
+    Group an iterable of lines into (section, text) tuples as they arrive (see split_into_sections).
+    """
+    current_section = "HEADER"
+    current_lines = []
+    for line in lines:
+        section = classify_section_header(line)
+        if section is not None:
+            if any(l.strip() for l in current_lines):
+                yield current_section, '\n'.join(current_lines).strip()
+            current_section = section
+            current_lines = []
+        current_lines.append(line)
+    if any(l.strip() for l in current_lines):
+        yield current_section, '\n'.join(current_lines).strip()
 
 def remove_bullet_points_from_sections(resume_text):
     """
@@ -54,32 +360,218 @@ def remove_bullet_points_from_sections(resume_text):
     
     # Track if we're currently in a Skills or Experience section
     in_target_section = False
-    current_section = None
     
     for line in lines:
         # Detect section headers (common formats)
-        if re.search(r'^(SKILLS|TECHNICAL SKILLS|EXPERTISE|CORE COMPETENCIES|KEY SKILLS)', line.strip().upper()):
-            in_target_section = True
-            current_section = "SKILLS"
-            processed_lines.append(line)
-        elif re.search(r'^(EXPERIENCE|WORK EXPERIENCE|PROFESSIONAL EXPERIENCE|EMPLOYMENT HISTORY)', line.strip().upper()):
-            in_target_section = True
-            current_section = "EXPERIENCE"
-            processed_lines.append(line)
-        elif re.search(r'^(EDUCATION|PROJECTS|ACHIEVEMENTS|CERTIFICATIONS|LANGUAGES|INTERESTS)', line.strip().upper()):
-            # Exiting a target section
-            in_target_section = False
-            current_section = None
+        section = classify_section_header(line)
+        if section is not None:
+            # Entering a target section, or exiting one for any other header
+            in_target_section = section in ("SKILLS", "EXPERIENCE")
             processed_lines.append(line)
+        elif in_target_section:
+            # Remove bullet points and any leading whitespace after the bullet
+            processed_lines.append(_BULLET_PREFIX_RE.sub('', line))
         else:
-            # Process lines within target sections
-            if in_target_section:
-                # Remove bullet points and any leading whitespace after the bullet
-                processed_line = re.sub(r'^[\s]*[•\-\*\+◦◘○◙♦❖⬧➢➤➔➧►❯❱]+\s*', '', line)
-                processed_lines.append(processed_line)
-            else:
-                # Keep other lines unchanged
-                processed_lines.append(line)
+            # Keep other lines unchanged
+            processed_lines.append(line)
     
     # Rejoin the lines to form the processed resume
     return '\n'.join(processed_lines)
+
+def strip_bullet(line):
+    """
+    Return line without its leading bullet glyph, or None if it is not a bulleted line.
+    """
+    match = _BULLET_PREFIX_RE.match(line)
+    return line[match.end():] if match else None
+
+# Section headers emitted by the model, in the order they are expected to appear
+SECTION_HEADERS = ["RESUME:", "COVER LETTER:", "ATS COMPATIBILITY ANALYSIS:", "INTERVIEW PREPARATION:"]
+_HEADER_CHARACTERS = frozenset("".join(SECTION_HEADERS))
+
+class StreamingSectionParser:
+    """
+    Incrementally split streamed model output into its RESUME:/COVER LETTER:/...
+    sections as chunks arrive.
+
+    Usage:
+        parser = StreamingSectionParser()
+        for chunk in optimize_resume_stream(...):
+            updated = parser.feed(chunk)  # names of sections that changed
+            ...parser.sections[name]...
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._pending = ""
+        self._parts = {}
+        self._joined = {}
+        self.current_section = None
+        self._next_header_index = 0
+
+    @property
+    def buffer(self):
+        """
+        All text fed so far.
+        """
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    @property
+    def sections(self):
+        """
+        Dictionary of section name (without the trailing colon) to its stripped content so far.
+        """
+        return {name: self._section_text(name) for name in self._parts}
+
+    def _section_text(self, name):
+        # Join each section at most once per change instead of on every chunk
+        if name not in self._joined:
+            parts = self._parts[name]
+            if len(parts) > 1:
+                parts[:] = ["".join(parts)]
+            self._joined[name] = parts[0].rstrip() if parts else ""
+        return self._joined[name]
+
+    def _held_back(self, text):
+        """
+        Length of the tail of text that could be the start of a header split across chunks.
+        """
+        if not text or text[-1] not in _HEADER_CHARACTERS:
+            return 0
+        tail = text[-(max(len(header) for header in SECTION_HEADERS) - 1):]
+        for offset in range(len(tail)):
+            suffix = tail[offset:]
+            if any(header.startswith(suffix) for header in SECTION_HEADERS[self._next_header_index:]):
+                return len(suffix)
+        return 0
+
+    def feed(self, chunk):
+        """
+        Add a chunk of streamed text. Only the chunk and a few held-back characters are scanned,
+        so the cost of each call does not grow with the length of the output.
+
+        Returns:
+        - A list of section headers whose content changed (without the trailing colon)
+        """
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        text = self._pending + chunk
+        start = 0
+        updated = []
+
+        # Look for headers in the newly available text, in the expected order.
+        # Headers are only accepted once so that later mentions do not split a section.
+        while self._next_header_index < len(SECTION_HEADERS):
+            found = None
+            for index in range(self._next_header_index, len(SECTION_HEADERS)):
+                position = text.find(SECTION_HEADERS[index], start)
+                if position != -1 and (found is None or position < found[0]):
+                    found = (position, index)
+            if found is None:
+                break
+            position, index = found
+            if self.current_section is not None:
+                self._append(text[start:position], updated)
+            header = SECTION_HEADERS[index]
+            self.current_section = header[:-1]
+            self._parts[self.current_section] = []
+            self._joined.pop(self.current_section, None)
+            updated.append(self.current_section)
+            start = position + len(header)
+            self._next_header_index = index + 1
+
+        # Hold back a possible partial header until the next chunk shows whether it is one
+        held = self._held_back(text[start:])
+        end = len(text) - held
+        if self.current_section is not None:
+            self._append(text[start:end], updated)
+        self._pending = text[end:]
+        return updated
+
+    def _append(self, text, updated):
+        parts = self._parts[self.current_section]
+        if not parts:
+            text = text.lstrip()
+        if not text:
+            return
+        parts.append(text)
+        self._joined.pop(self.current_section, None)
+        # Whitespace alone does not change the stripped content
+        if text.strip() and self.current_section not in updated:
+            updated.append(self.current_section)
+
+    def finish(self):
+        """
+        Flush any held-back text and return the completed sections dictionary.
+        """
+        if self.current_section is not None:
+            self._append(self._pending, [])
+        self._pending = ""
+        return self.sections
+
+    @property
+    def output(self):
+        """
+        The cleaned full output (everything from the first RESUME: header).
+        """
+        buffer = self.buffer
+        position = buffer.find(SECTION_HEADERS[0])
+        return buffer[position:] if position != -1 else buffer
+
+_OUTPUT_HEADER_RE = re.compile(r"(RESUME|COVER LETTER|ATS COMPATIBILITY ANALYSIS|INTERVIEW PREPARATION):")
+_MARKDOWN_FENCE_RE = re.compile(r"```markdown(.*?)```", re.DOTALL)
+
+class ParsedOutput:
+    """
+    Structured view of a complete model response, produced once by parse_optimization_output.
+
+    Attributes:
+    - raw: the full output text
+    - resume, cover_letter, ats_analysis, interview_preparation: section texts ("" if missing)
+    - ats_markdown: the ATS analysis without its ```markdown fence
+    - processed_resume: the resume with bullets removed from Skills/Experience sections
+    """
+
+    def __init__(self, raw, sections):
+        self.raw = raw
+        self.sections = sections
+        self.resume = sections.get("RESUME", "")
+        self.cover_letter = sections.get("COVER LETTER", "")
+        self.ats_analysis = sections.get("ATS COMPATIBILITY ANALYSIS", "")
+        self.interview_preparation = sections.get("INTERVIEW PREPARATION", "")
+
+        fence = _MARKDOWN_FENCE_RE.search(self.ats_analysis)
+        self.ats_markdown = fence.group(1).strip() if fence else self.ats_analysis
+        self.processed_resume = remove_bullet_points_from_sections(self.resume)
+
+    def has_section(self, name):
+        return name in self.sections
+
+def parse_optimization_output(output):
+    """
+    Split model output into its sections in a single scan.
+
+    Each header is accepted once and only after the previous one, matching how
+    the output format is specified in the prompt.
+    """
+    with span("parse_output", output_chars=len(output or "")):
+        return _parse_optimization_output(output)
+
+def _parse_optimization_output(output):
+    header_names = [header[:-1] for header in SECTION_HEADERS]
+    boundaries = []
+    next_index = 0
+    for match in _OUTPUT_HEADER_RE.finditer(output or ""):
+        index = header_names.index(match.group(1))
+        if index >= next_index:
+            boundaries.append((match.group(1), match.start(), match.end()))
+            next_index = index + 1
+
+    sections = {}
+    for position, (name, _, content_start) in enumerate(boundaries):
+        content_end = boundaries[position + 1][1] if position + 1 < len(boundaries) else len(output)
+        sections[name] = output[content_start:content_end].strip()
+    return ParsedOutput(output or "", sections)